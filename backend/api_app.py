@@ -1,16 +1,28 @@
 """
 FastAPI application for OAuth authentication and API endpoints.
+
+The database schema is not created at startup; run ``python cli.py init-db``
+once before starting the server.
 """
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, WebSocket, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 import uvicorn
+import anyio
+import orjson
 import os
 
 from services.auth_endpoints import auth_router
 from services.user_endpoints import user_router
-from models.database import init_database
-from config.env_validator import ConfigValidator
+from services.wine_recognition_endpoints import router as wine_router
+from services.livekit_endpoints import router as livekit_router, guest_router as livekit_guest_router
+from services.translation_endpoints import translation_websocket_endpoint
+from services.translation_api_endpoints import router as translation_router
+from services.multilingual_endpoints import multilingual_router
+from services.livekit_translation_endpoints import translation_router as livekit_translation_router
+from models.database import get_db
+from config.validator import ConfigValidator
+from utils.middleware import SecurityHeadersMiddleware
 
 # Create FastAPI app
 app = FastAPI(
@@ -35,34 +47,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Include routers
-app.include_router(auth_router)
-app.include_router(user_router)
-
-# Import and include wine recognition router
-from services.wine_recognition_endpoints import router as wine_router
-app.include_router(wine_router)
-
-# Import and include LiveKit room management router
-from services.livekit_endpoints import router as livekit_router
-app.include_router(livekit_router)
-
-# Import and include translation WebSocket endpoint
-from services.translation_endpoints import translation_websocket_endpoint
-from fastapi import WebSocket, Depends
-from models.database import get_db
-
-# Import and include translation API router
-from services.translation_api_endpoints import router as translation_router
-app.include_router(translation_router)
-
-# Import and include multilingual content router
-from services.multilingual_endpoints import multilingual_router
-app.include_router(multilingual_router)
+# Security headers on every HTTP response
+app.add_middleware(SecurityHeadersMiddleware)
 
-# Import and include LiveKit translation router
-from services.livekit_translation_endpoints import translation_router as livekit_translation_router
-app.include_router(livekit_translation_router)
+# Include routers
+for router in (
+    auth_router,
+    user_router,
+    wine_router,
+    livekit_router,
+    livekit_guest_router,
+    translation_router,
+    multilingual_router,
+    livekit_translation_router,
+):
+    app.include_router(router)
 
 @app.websocket("/ws/translation/{user_id}/{room_id}")
 async def websocket_translation_endpoint(
@@ -78,12 +77,15 @@ async def websocket_translation_endpoint(
 @app.on_event("startup")
 async def startup_event():
     """Initialize application on startup."""
-    # Validate configuration
-    if not ConfigValidator.validate_all():
+    # Raise the thread pool used for sync endpoints (AnyIO default is 40)
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    limiter.total_tokens = int(os.getenv("FASTAPI_THREADS", "200"))
+    
+    # Validate configuration (off the event loop)
+    if not await anyio.to_thread.run_sync(ConfigValidator.validate_all):
         raise RuntimeError("Configuration validation failed")
     
-    # Initialize database
-    init_database()
+    # No DDL here: each worker would run it; schema comes from `cli.py init-db`
     
     print("🚀 FastAPI server started successfully")
     print("📋 Available OAuth providers:")
@@ -93,22 +95,25 @@ async def startup_event():
     for provider_name in enabled_providers.keys():
         print(f"   ✅ {provider_name}")
 
+# Pre-encoded root endpoint body
+_ROOT = orjson.dumps({
+    "message": "Wine Chat API",
+    "version": "1.0.0",
+    "status": "running"
+})
+
 @app.get("/")
 async def root():
     """Root endpoint."""
-    return {
-        "message": "Wine Chat API",
-        "version": "1.0.0",
-        "status": "running"
-    }
+    return Response(_ROOT, media_type="application/json")
+
+# Pre-encoded health probe body
+_HEALTH = b'{"status":"healthy"}'
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
-    return {
-        "status": "healthy",
-        "timestamp": "2024-01-01T00:00:00Z"
-    }
+    return Response(_HEALTH, media_type="application/json")
 
 @app.exception_handler(404)
 async def not_found_handler(request, exc):
@@ -132,9 +137,12 @@ if __name__ == "__main__":
     host = os.getenv("API_HOST", "0.0.0.0")
     
     uvicorn.run(
-        app,
+        "api_app:app",
         host=host,
         port=port,
-        reload=True,
+        reload=bool(int(os.getenv("API_RELOAD", "0"))),
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.getenv("API_WORKERS", "1")),
         log_level="info"
     )
\ No newline at end of file
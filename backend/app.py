@@ -1,58 +1,155 @@
 import streamlit as st
 import os
+import hashlib
+import asyncio
 from dotenv import load_dotenv
 from livekit import api
 import sqlite3
+import queue
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
 import json
+import logging
 
 # 環境変数の読み込み
 load_dotenv()
 
-# データベース初期化
+logger = logging.getLogger(__name__)
+
+# 選択可能なメイン言語
+_LANGUAGES = {
+    'ja': '日本語',
+    'en': 'English',
+    'ko': '한국어',
+    'zh': '中文',
+    'es': 'Español',
+    'fr': 'Français',
+    'de': 'Deutsch'
+}
+_LANG_KEYS = tuple(_LANGUAGES)
+_LANG_INDEX = {code: i for i, code in enumerate(_LANG_KEYS)}
+
+# SQLite 接続設定（WAL・同期緩和・キャッシュ拡大・ビジータイムアウト）
+_SQLITE_PRAGMAS = '''
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA busy_timeout=5000;
+    PRAGMA cache_size=-20000;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA foreign_keys=ON;
+'''
+
+# 読み取り専用接続用（journal_mode は書き込み接続側で設定済み）
+_SQLITE_READ_PRAGMAS = '''
+    PRAGMA busy_timeout=5000;
+    PRAGMA cache_size=-20000;
+    PRAGMA temp_store=MEMORY;
+'''
+
+# SQL 文（接続ごとの文キャッシュに乗るよう文字列を固定）
+_SQL_GET_USER = (
+    'SELECT id, google_id, email, name, main_language '
+    'FROM users WHERE google_id = ?'
+)
+_SQL_INSERT_USER = (
+    'INSERT INTO users (google_id, email, name, main_language) '
+    'VALUES (?, ?, ?, ?)'
+)
+_SQL_UPDATE_LANGUAGE = 'UPDATE users SET main_language = ? WHERE google_id = ?'
+
+# データベース接続
+def _connect(database='users.db', pragmas=_SQLITE_PRAGMAS, **kwargs):
+    conn = sqlite3.connect(
+        database,
+        timeout=5.0,
+        isolation_level=None,
+        check_same_thread=False,
+        **kwargs
+    )
+    conn.executescript(pragmas)
+    return conn
+
+# 書き込み用の単一接続（Streamlit の再実行をまたいでプロセス内で共有）
+@st.cache_resource
+def _get_writer():
+    return _connect(), threading.Lock()
+
+# 読み取り専用接続プール（CPU 数分）
+@st.cache_resource
+def _get_reader_pool():
+    # 読み取り専用接続はファイルが存在しないと開けないため先にスキーマを作成
+    init_db()
+    pool = queue.Queue()
+    for _ in range(os.cpu_count() or 1):
+        pool.put(_connect('file:users.db?mode=ro', _SQLITE_READ_PRAGMAS, uri=True))
+    return pool
+
+# 読み取り接続の貸し出し
+@contextmanager
+def _read_conn():
+    pool = _get_reader_pool()
+    conn = pool.get()
+    try:
+        yield conn
+    finally:
+        pool.put(conn)
+
+# 書き込みトランザクション（BEGIN IMMEDIATE で書き込みロックを先に取得）
+@contextmanager
+def _write_tx():
+    conn, lock = _get_writer()
+    with lock:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+# データベース初期化（プロセスごとに一度だけ実行）
+@st.cache_resource
 def init_db():
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            google_id TEXT UNIQUE,
-            email TEXT,
-            name TEXT,
-            main_language TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    conn.commit()
-    conn.close()
+    with _write_tx() as conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                google_id TEXT UNIQUE,
+                email TEXT,
+                name TEXT,
+                main_language TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
 
 # ユーザー登録
 def register_user(google_id, email, name, main_language):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
     try:
-        c.execute('''
-            INSERT INTO users (google_id, email, name, main_language)
-            VALUES (?, ?, ?, ?)
-        ''', (google_id, email, name, main_language))
-        conn.commit()
+        with _write_tx() as conn:
+            conn.execute(
+                _SQL_INSERT_USER,
+                (google_id, email, name, main_language)
+            )
         return True
     except sqlite3.IntegrityError:
         return False
-    finally:
-        conn.close()
 
 # ユーザー取得
 def get_user(google_id):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('SELECT * FROM users WHERE google_id = ?', (google_id,))
-    user = c.fetchone()
-    conn.close()
-    return user
+    with _read_conn() as conn:
+        return conn.execute(_SQL_GET_USER, (google_id,)).fetchone()
+
+# LiveKit トークンのキャッシュ単位（秒）
+_TOKEN_BUCKET_SECONDS = 300
 
-# LiveKit トークン生成
+# LiveKit トークン生成（同一ユーザー・ルームは 5 分間同じトークンを再利用）
 def generate_livekit_token(user_id, room_name):
+    return _mint_livekit_token(user_id, room_name, int(time.time()) // _TOKEN_BUCKET_SECONDS)
+
+@st.cache_resource(max_entries=1024)
+def _mint_livekit_token(user_id, room_name, exp_bucket):
     token = api.AccessToken(
         api_key=os.getenv('LIVEKIT_API_KEY'),
         api_secret=os.getenv('LIVEKIT_API_SECRET')
@@ -67,6 +164,46 @@ def generate_livekit_token(user_id, room_name):
     ))
     return token.to_jwt()
 
+# 簡易的なルーム一覧（LiveKit 未設定時のフォールバック）
+_SAMPLE_ROOMS = (
+    {"name": "general", "participants": 3},
+    {"name": "meeting-room-1", "participants": 5},
+    {"name": "casual-chat", "participants": 2}
+)
+
+# LiveKit のルーム一覧取得
+async def _list_livekit_rooms():
+    lkapi = api.LiveKitAPI(
+        os.getenv('LIVEKIT_URL'),
+        os.getenv('LIVEKIT_API_KEY'),
+        os.getenv('LIVEKIT_API_SECRET')
+    )
+    try:
+        response = await lkapi.room.list_rooms(api.ListRoomsRequest())
+        return [
+            {"name": room.name, "participants": room.num_participants}
+            for room in response.rooms
+        ]
+    finally:
+        await lkapi.aclose()
+
+# ルーム一覧（再実行のたびに API を呼ばないよう 5 秒間キャッシュ。例外はキャッシュされない）
+@st.cache_data(ttl=5)
+def _cached_rooms():
+    return asyncio.run(_list_livekit_rooms())
+
+def fetch_rooms():
+    # LiveKit 未設定時のみサンプルを表示
+    if not (os.getenv('LIVEKIT_URL') and os.getenv('LIVEKIT_API_KEY') and os.getenv('LIVEKIT_API_SECRET')):
+        return list(_SAMPLE_ROOMS)
+    
+    try:
+        return _cached_rooms()
+    except Exception:
+        logger.exception("Failed to list LiveKit rooms")
+        st.error("ルーム一覧を取得できませんでした。しばらくしてから再度お試しください。")
+        return []
+
 def main():
     st.set_page_config(
         page_title="LiveKit Video Chat App",
@@ -105,8 +242,8 @@ def show_login_page():
             
             if st.form_submit_button("🔐 Googleでログイン", use_container_width=True):
                 if email and name:
-                    # 簡易的なGoogle IDシミュレーション
-                    google_id = f"google_{hash(email)}"
+                    # 簡易的なGoogle IDシミュレーション（再起動後も同じ値になる安定ハッシュ）
+                    google_id = "google_" + hashlib.blake2b(email.encode(), digest_size=8).hexdigest()
                     
                     # ユーザー確認
                     user = get_user(google_id)
@@ -139,23 +276,13 @@ def show_language_selection():
     st.markdown("---")
     st.markdown("#### メイン言語を選択してください")
     
-    languages = {
-        'ja': '日本語',
-        'en': 'English',
-        'ko': '한국어',
-        'zh': '中文',
-        'es': 'Español',
-        'fr': 'Français',
-        'de': 'Deutsch'
-    }
-    
     col1, col2, col3 = st.columns([1, 2, 1])
     
     with col2:
         selected_language = st.selectbox(
             "メイン言語",
-            options=list(languages.keys()),
-            format_func=lambda x: languages[x]
+            options=_LANG_KEYS,
+            format_func=lambda x: _LANGUAGES[x]
         )
         
         if st.button("登録完了", use_container_width=True):
@@ -241,35 +368,22 @@ def show_settings():
     
     user_data = st.session_state.user_data
     
-    languages = {
-        'ja': '日本語',
-        'en': 'English',
-        'ko': '한국어',
-        'zh': '中文',
-        'es': 'Español',
-        'fr': 'Français',
-        'de': 'Deutsch'
-    }
-    
-    current_lang_index = list(languages.keys()).index(user_data['main_language'])
+    current_lang_index = _LANG_INDEX[user_data['main_language']]
     
     new_language = st.selectbox(
         "メイン言語",
-        options=list(languages.keys()),
+        options=_LANG_KEYS,
         index=current_lang_index,
-        format_func=lambda x: languages[x]
+        format_func=lambda x: _LANGUAGES[x]
     )
     
     if st.button("設定を更新"):
         # データベース更新
-        conn = sqlite3.connect('users.db')
-        c = conn.cursor()
-        c.execute(
-            'UPDATE users SET main_language = ? WHERE google_id = ?',
-            (new_language, user_data['google_id'])
-        )
-        conn.commit()
-        conn.close()
+        with _write_tx() as conn:
+            conn.execute(
+                _SQL_UPDATE_LANGUAGE,
+                (new_language, user_data['google_id'])
+            )
         
         # セッション更新
         st.session_state.user_data['main_language'] = new_language
@@ -278,27 +392,36 @@ def show_settings():
 def show_room_list():
     st.markdown("### アクティブなルーム")
     
-    # 簡易的なルーム一覧（実際の実装ではLiveKit APIを使用）
-    rooms = [
-        {"name": "general", "participants": 3},
-        {"name": "meeting-room-1", "participants": 5},
-        {"name": "casual-chat", "participants": 2}
-    ]
+    rooms = fetch_rooms()
     
-    for room in rooms:
-        col1, col2, col3 = st.columns([2, 1, 1])
-        
-        with col1:
-            st.write(f"**{room['name']}**")
-        
-        with col2:
-            st.write(f"👥 {room['participants']} 人")
-        
-        with col3:
-            if st.button(f"参加", key=f"join_{room['name']}"):
-                user_data = st.session_state.user_data
-                token = generate_livekit_token(user_data['google_id'], room['name'])
-                st.success(f"ルーム '{room['name']}' に参加準備完了！")
+    if not rooms:
+        st.info("現在アクティブなルームはありません。")
+        return
+    
+    # 一覧は 1 つのテーブルで描画し、参加操作は選択式にまとめる
+    st.dataframe(
+        [
+            {"ルーム名": room['name'], "参加者": f"👥 {room['participants']} 人"}
+            for room in rooms
+        ],
+        use_container_width=True,
+        hide_index=True
+    )
+    
+    col1, col2 = st.columns([3, 1])
+    
+    with col1:
+        selected_room = st.selectbox(
+            "参加するルーム",
+            options=[room['name'] for room in rooms],
+            key="join_room_select"
+        )
+    
+    with col2:
+        if st.button("参加", key="join_selected_room", use_container_width=True):
+            user_data = st.session_state.user_data
+            token = generate_livekit_token(user_data['google_id'], selected_room)
+            st.success(f"ルーム '{selected_room}' に参加準備完了！")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
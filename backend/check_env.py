@@ -6,14 +6,15 @@ from dotenv import load_dotenv
 
 # Load .env file
 load_dotenv()
+env = os.environ
 
 print("=" * 50)
 print("Environment Variables Check")
 print("=" * 50)
 
 # Check Google OAuth
-google_client_id = os.getenv('GOOGLE_CLIENT_ID', '')
-google_client_secret = os.getenv('GOOGLE_CLIENT_SECRET', '')
+google_client_id = env.get('GOOGLE_CLIENT_ID', '')
+google_client_secret = env.get('GOOGLE_CLIENT_SECRET', '')
 
 print(f"\nGoogle OAuth Configuration:")
 print(f"  GOOGLE_CLIENT_ID set: {bool(google_client_id)}")
@@ -31,9 +32,9 @@ else:
     print(f"  GOOGLE_CLIENT_SECRET value: '{google_client_secret}'")
 
 # Check LiveKit
-livekit_key = os.getenv('LIVEKIT_API_KEY', '')
-livekit_secret = os.getenv('LIVEKIT_API_SECRET', '')
-livekit_url = os.getenv('LIVEKIT_URL', '')
+livekit_key = env.get('LIVEKIT_API_KEY', '')
+livekit_secret = env.get('LIVEKIT_API_SECRET', '')
+livekit_url = env.get('LIVEKIT_URL', '')
 
 print(f"\nLiveKit Configuration:")
 print(f"  LIVEKIT_API_KEY set: {bool(livekit_key)}")
@@ -41,7 +42,7 @@ print(f"  LIVEKIT_API_SECRET set: {bool(livekit_secret)}")
 print(f"  LIVEKIT_URL: {livekit_url}")
 
 # Check Backend URL
-backend_url = os.getenv('BACKEND_URL', 'http://localhost:8000')
+backend_url = env.get('BACKEND_URL', 'http://localhost:8000')
 print(f"\nBackend Configuration:")
 print(f"  BACKEND_URL: {backend_url}")
 
@@ -4,13 +4,13 @@ Wine Chat CLI - Command line interface for application management.
 """
 import sys
 import argparse
-from backend.config.env_validator import EnvironmentValidator
-from backend.utils.startup import run_startup_sequence
 
 def validate_env(args):
     """Validate environment configuration."""
     print("🔍 Validating environment configuration...\n")
     
+    from config.env_validator import EnvironmentValidator
+    
     success = EnvironmentValidator.print_validation_report(detailed=args.detailed)
     
     if success:
@@ -28,6 +28,8 @@ def check_startup(args):
     """Run startup checks."""
     print("🚀 Running startup checks...\n")
     
+    from utils.startup import run_startup_sequence
+    
     success = run_startup_sequence(verbose=True)
     
     return 0 if success else 1
@@ -37,13 +39,17 @@ def init_db(args):
     print("🗄️  Initializing database...\n")
     
     try:
-        from backend.models.database import init_database
-        from backend.utils.startup import StartupManager
+        from models.database import init_database, ensure_indexes
+        from utils.startup import StartupManager
         
         # Initialize database tables
         init_database()
         print("✅ Database tables created")
         
+        # Create missing indexes and update query planner statistics
+        ensure_indexes()
+        print("✅ Database indexes verified")
+        
         # Create default data
         startup_manager = StartupManager()
         if startup_manager.create_default_data():
@@ -58,32 +64,26 @@ def init_db(args):
         print(f"❌ Database initialization failed: {str(e)}")
         return 1
 
+def _get_alembic_config():
+    """Build the Alembic config for the backend migrations."""
+    from alembic.config import Config
+    
+    alembic_cfg = Config('backend/alembic.ini')
+    alembic_cfg.set_main_option('script_location', 'backend/migrations')
+    return alembic_cfg
+
 def generate_migration(args):
     """Generate database migration."""
     print("📝 Generating database migration...\n")
     
     try:
-        import subprocess
-        import os
+        from alembic import command
         
-        # Change to backend directory
-        os.chdir('backend')
+        # Run alembic revision in-process
+        command.revision(_get_alembic_config(), message=args.message, autogenerate=True)
         
-        # Run alembic revision
-        cmd = ['alembic', 'revision', '--autogenerate']
-        if args.message:
-            cmd.extend(['-m', args.message])
-        
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        if result.returncode == 0:
-            print("✅ Migration generated successfully!")
-            print(result.stdout)
-            return 0
-        else:
-            print("❌ Migration generation failed!")
-            print(result.stderr)
-            return 1
+        print("✅ Migration generated successfully!")
+        return 0
     
     except Exception as e:
         print(f"❌ Migration generation failed: {str(e)}")
@@ -94,23 +94,13 @@ def run_migration(args):
     print("🔄 Running database migrations...\n")
     
     try:
-        import subprocess
-        import os
-        
-        # Change to backend directory
-        os.chdir('backend')
+        from alembic import command
         
-        # Run alembic upgrade
-        result = subprocess.run(['alembic', 'upgrade', 'head'], capture_output=True, text=True)
+        # Run alembic upgrade in-process
+        command.upgrade(_get_alembic_config(), 'head')
         
-        if result.returncode == 0:
-            print("✅ Migrations applied successfully!")
-            print(result.stdout)
-            return 0
-        else:
-            print("❌ Migration failed!")
-            print(result.stderr)
-            return 1
+        print("✅ Migrations applied successfully!")
+        return 0
     
     except Exception as e:
         print(f"❌ Migration failed: {str(e)}")
@@ -121,7 +111,7 @@ def seed_wine_data(args):
     print("🍷 Seeding wine database with sample data...\n")
     
     try:
-        from backend.services.wine_data_seeder import wine_data_seeder
+        from services.wine_data_seeder import wine_data_seeder
         
         # Seed sample wines
         if wine_data_seeder.seed_sample_wines():
@@ -161,8 +151,48 @@ def create_env_file(args):
         print(f"❌ Failed to create .env file: {str(e)}")
         return 1
 
+def add_validate_env_arguments(parser):
+    """Arguments for validate-env."""
+    parser.add_argument('--detailed', action='store_true', help='Show detailed validation report')
+
+def add_generate_migration_arguments(parser):
+    """Arguments for generate-migration."""
+    parser.add_argument('-m', '--message', help='Migration message')
+
+def add_create_env_arguments(parser):
+    """Arguments for create-env."""
+    parser.add_argument('--force', action='store_true', help='Overwrite existing .env file')
+
+# Command name -> (help text, argument builder, handler)
+COMMANDS = {
+    'validate-env': ('Validate environment configuration', add_validate_env_arguments, validate_env),
+    'check-startup': ('Run startup checks', None, check_startup),
+    'init-db': ('Initialize database', None, init_db),
+    'generate-migration': ('Generate database migration', add_generate_migration_arguments, generate_migration),
+    'run-migrations': ('Run database migrations', None, run_migration),
+    'seed-wine-data': ('Seed database with sample wine data', None, seed_wine_data),
+    'create-env': ('Create .env file from template', add_create_env_arguments, create_env_file),
+}
+
+def run_command(command, args):
+    """Run a command handler, reporting interruptions and unexpected errors."""
+    try:
+        return COMMANDS[command][2](args)
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Operation cancelled by user")
+        return 1
+    except Exception as e:
+        print(f"\n❌ Unexpected error: {str(e)}")
+        return 1
+
 def main():
     """Main CLI entry point."""
+    # Commands that take no options don't need the parser at all
+    if len(sys.argv) == 2:
+        command = sys.argv[1]
+        if command in COMMANDS and COMMANDS[command][1] is None:
+            return run_command(command, argparse.Namespace(command=command))
+    
     parser = argparse.ArgumentParser(
         description='Wine Chat CLI - Application management tool',
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -177,36 +207,10 @@ Examples:
     
     subparsers = parser.add_subparsers(dest='command', help='Available commands')
     
-    # Validate environment command
-    validate_parser = subparsers.add_parser('validate-env', help='Validate environment configuration')
-    validate_parser.add_argument('--detailed', action='store_true', help='Show detailed validation report')
-    validate_parser.set_defaults(func=validate_env)
-    
-    # Check startup command
-    startup_parser = subparsers.add_parser('check-startup', help='Run startup checks')
-    startup_parser.set_defaults(func=check_startup)
-    
-    # Initialize database command
-    init_parser = subparsers.add_parser('init-db', help='Initialize database')
-    init_parser.set_defaults(func=init_db)
-    
-    # Generate migration command
-    migration_parser = subparsers.add_parser('generate-migration', help='Generate database migration')
-    migration_parser.add_argument('-m', '--message', help='Migration message')
-    migration_parser.set_defaults(func=generate_migration)
-    
-    # Run migration command
-    migrate_parser = subparsers.add_parser('run-migrations', help='Run database migrations')
-    migrate_parser.set_defaults(func=run_migration)
-    
-    # Seed wine data command
-    seed_parser = subparsers.add_parser('seed-wine-data', help='Seed database with sample wine data')
-    seed_parser.set_defaults(func=seed_wine_data)
-    
-    # Create env file command
-    env_parser = subparsers.add_parser('create-env', help='Create .env file from template')
-    env_parser.add_argument('--force', action='store_true', help='Overwrite existing .env file')
-    env_parser.set_defaults(func=create_env_file)
+    for name, (help_text, add_arguments, _) in COMMANDS.items():
+        command_parser = subparsers.add_parser(name, help=help_text)
+        if add_arguments:
+            add_arguments(command_parser)
     
     # Parse arguments
     args = parser.parse_args()
@@ -216,14 +220,7 @@ Examples:
         return 1
     
     # Run the selected command
-    try:
-        return args.func(args)
-    except KeyboardInterrupt:
-        print("\n\n⚠️  Operation cancelled by user")
-        return 1
-    except Exception as e:
-        print(f"\n❌ Unexpected error: {str(e)}")
-        return 1
+    return run_command(args.command, args)
 
 if __name__ == '__main__':
     sys.exit(main())
\ No newline at end of file
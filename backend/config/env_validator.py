@@ -1,13 +1,33 @@
 """
 Comprehensive environment variable validation system.
 """
+import io
 import os
 import sys
 import re
-from typing import Dict, List, Optional, Any, Tuple
+import time
+from datetime import datetime
+from types import MappingProxyType
+from typing import Dict, FrozenSet, List, Optional, Any, Tuple
 from urllib.parse import urlparse
 from config.settings import Config
 
+# Precompiled validation patterns
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
+# Default/weak secret fragments, matched anywhere in a key (case-insensitive)
+_WEAK_KEYS = (
+    'dev-secret-key',
+    'change-in-production',
+    'your_secret_key',
+    'secret',
+    '123456'
+)
+_WEAK_KEY_RE = re.compile('|'.join(map(re.escape, _WEAK_KEYS)), re.IGNORECASE)
+
+# Server database URLs that need host/port parsing
+_SERVER_DB_PREFIXES = ('postgresql://', 'mysql://')
+
 class ValidationError(Exception):
     """Custom exception for validation errors."""
     pass
@@ -16,126 +36,176 @@ class EnvironmentValidator:
     """Comprehensive environment variable validation."""
     
     # Required variables that must be present
-    REQUIRED_VARS = [
+    REQUIRED_VARS = (
         'SECRET_KEY',
         'JWT_SECRET_KEY',
-    ]
+    )
     
     # LiveKit configuration
-    LIVEKIT_VARS = [
+    LIVEKIT_VARS = (
         'LIVEKIT_API_KEY',
         'LIVEKIT_API_SECRET',
         'LIVEKIT_URL'
-    ]
+    )
     
     # OAuth provider configurations
-    OAUTH_PROVIDERS = {
+    OAUTH_PROVIDERS = MappingProxyType({
         'google': {
-            'vars': ['GOOGLE_CLIENT_ID', 'GOOGLE_CLIENT_SECRET'],
+            'vars': ('GOOGLE_CLIENT_ID', 'GOOGLE_CLIENT_SECRET'),
             'name': 'Google OAuth'
         },
         'twitter': {
-            'vars': ['TWITTER_CLIENT_ID', 'TWITTER_CLIENT_SECRET'],
+            'vars': ('TWITTER_CLIENT_ID', 'TWITTER_CLIENT_SECRET'),
             'name': 'Twitter/X OAuth'
         },
         'line': {
-            'vars': ['LINE_CLIENT_ID', 'LINE_CLIENT_SECRET'],
+            'vars': ('LINE_CLIENT_ID', 'LINE_CLIENT_SECRET'),
             'name': 'LINE Login'
         }
-    }
+    })
     
     # Google Cloud API configurations
-    GOOGLE_CLOUD_APIS = {
+    GOOGLE_CLOUD_APIS = MappingProxyType({
         'vision': {
-            'vars': ['GOOGLE_VISION_API_KEY'],
+            'vars': ('GOOGLE_VISION_API_KEY',),
             'name': 'Google Vision API'
         },
         'translate': {
-            'vars': ['GOOGLE_TRANSLATE_API_KEY'],
+            'vars': ('GOOGLE_TRANSLATE_API_KEY',),
             'name': 'Google Translate API'
         },
         'speech': {
-            'vars': ['GOOGLE_SPEECH_TO_TEXT_API_KEY'],
+            'vars': ('GOOGLE_SPEECH_TO_TEXT_API_KEY',),
             'name': 'Google Speech-to-Text API'
         },
         'tts': {
-            'vars': ['GOOGLE_TEXT_TO_SPEECH_API_KEY'],
+            'vars': ('GOOGLE_TEXT_TO_SPEECH_API_KEY',),
             'name': 'Google Text-to-Speech API'
         }
-    }
+    })
     
     # Optional service configurations
-    OPTIONAL_SERVICES = {
+    OPTIONAL_SERVICES = MappingProxyType({
         'wine_api': {
-            'vars': ['WINE_API_KEY', 'WINE_API_BASE_URL'],
+            'vars': ('WINE_API_KEY', 'WINE_API_BASE_URL'),
             'name': 'Wine Database API'
         },
         'redis': {
-            'vars': ['REDIS_URL'],
+            'vars': ('REDIS_URL',),
             'name': 'Redis Cache'
         },
         'email': {
-            'vars': ['SMTP_SERVER', 'SMTP_USERNAME', 'SMTP_PASSWORD'],
+            'vars': ('SMTP_SERVER', 'SMTP_USERNAME', 'SMTP_PASSWORD'),
             'name': 'Email Service'
         },
         'sentry': {
-            'vars': ['SENTRY_DSN'],
+            'vars': ('SENTRY_DSN',),
             'name': 'Sentry Error Tracking'
         },
         'aws_s3': {
-            'vars': ['AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY', 'AWS_S3_BUCKET_NAME'],
+            'vars': ('AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY', 'AWS_S3_BUCKET_NAME'),
             'name': 'AWS S3 Storage'
         }
-    }
+    })
+    
+    # Format checks per variable: name -> (validator method, error message)
+    VAR_VALIDATORS = MappingProxyType({
+        'LIVEKIT_URL': ('_is_valid_websocket_url', 'Invalid WebSocket URL format'),
+        'GOOGLE_CLIENT_ID': ('_is_valid_client_id', 'Invalid client ID format'),
+        'TWITTER_CLIENT_ID': ('_is_valid_client_id', 'Invalid client ID format'),
+        'LINE_CLIENT_ID': ('_is_valid_client_id', 'Invalid client ID format'),
+        'GOOGLE_VISION_API_KEY': ('_is_valid_api_key', 'Invalid API key format'),
+        'GOOGLE_TRANSLATE_API_KEY': ('_is_valid_api_key', 'Invalid API key format'),
+        'GOOGLE_SPEECH_TO_TEXT_API_KEY': ('_is_valid_api_key', 'Invalid API key format'),
+        'GOOGLE_TEXT_TO_SPEECH_API_KEY': ('_is_valid_api_key', 'Invalid API key format'),
+        'REDIS_URL': ('_is_valid_redis_url', 'Invalid Redis URL format'),
+        'SENTRY_DSN': ('_is_valid_sentry_dsn', 'Invalid Sentry DSN format')
+    })
+    
+    # Variables read by the validators outside the groups above
+    EXTRA_VARS = (
+        'DATABASE_URL',
+        'ENVIRONMENT',
+        'DEBUG'
+    )
+    
+    # Every variable name the validators read
+    _ALL_VARS_FLAT = frozenset(REQUIRED_VARS + LIVEKIT_VARS + EXTRA_VARS).union(*(
+        config['vars']
+        for group in (OAUTH_PROVIDERS, GOOGLE_CLOUD_APIS, OPTIONAL_SERVICES)
+        for config in group.values()
+    ))
+    
+    # Snapshot of the relevant environment variables, shared by validate_* methods
+    _env_cache: Optional[Dict[str, str]] = None
+    
+    # Names from _ALL_VARS_FLAT that are unset or empty in the snapshot
+    _missing_cache: Optional[FrozenSet[str]] = None
+    
+    # Last comprehensive report as (monotonic time, report)
+    _report_cache: Optional[Tuple[float, Dict[str, Any]]] = None
+    
+    @classmethod
+    def _snapshot_env(cls) -> Dict[str, str]:
+        """Read the relevant environment variables once (unset ones are omitted)."""
+        environ = os.environ
+        return {name: environ[name] for name in cls._ALL_VARS_FLAT & environ.keys()}
+    
+    @classmethod
+    def _env(cls) -> Dict[str, str]:
+        """Get the environment snapshot, taking it on first use."""
+        if cls._env_cache is None:
+            cls._env_cache = cls._snapshot_env()
+        return cls._env_cache
+    
+    @classmethod
+    def _missing(cls) -> FrozenSet[str]:
+        """Get the known variables that are unset or empty, computed once per snapshot."""
+        if cls._missing_cache is None:
+            cls._missing_cache = cls._ALL_VARS_FLAT.difference(
+                name for name, value in cls._env().items() if value
+            )
+        return cls._missing_cache
+    
+    @classmethod
+    def invalidate_cache(cls) -> None:
+        """Drop the cached environment snapshot and report."""
+        cls._env_cache = None
+        cls._missing_cache = None
+        cls._report_cache = None
     
     @classmethod
     def validate_required_vars(cls) -> List[str]:
         """Validate required environment variables."""
-        missing = []
-        
-        for var in cls.REQUIRED_VARS:
-            if not os.getenv(var):
-                missing.append(var)
-        
-        return missing
+        missing = cls._missing()
+        return [var for var in cls.REQUIRED_VARS if var in missing]
     
     @classmethod
-    def validate_livekit_config(cls) -> Dict[str, Any]:
-        """Validate LiveKit configuration."""
-        missing = []
+    def _check_vars(cls, var_names) -> Tuple[List[str], List[str]]:
+        """Split variables into missing ones and present ones failing their format check."""
+        env = cls._env()
+        missing_set = cls._missing()
+        missing = [var for var in var_names if var in missing_set]
         invalid = []
         
-        for var in cls.LIVEKIT_VARS:
-            value = os.getenv(var)
-            if not value:
-                missing.append(var)
-            elif var == 'LIVEKIT_URL':
-                if not cls._is_valid_websocket_url(value):
-                    invalid.append(f"{var}: Invalid WebSocket URL format")
+        for var in var_names:
+            if var in missing_set:
+                continue
+            
+            check = cls.VAR_VALIDATORS.get(var)
+            if check and not getattr(cls, check[0])(env[var]):
+                invalid.append(f"{var}: {check[1]}")
         
-        return {
-            'enabled': len(missing) == 0,
-            'missing': missing,
-            'invalid': invalid
-        }
+        return missing, invalid
     
     @classmethod
-    def validate_oauth_providers(cls) -> Dict[str, Dict[str, Any]]:
-        """Validate OAuth provider configurations."""
+    def _validate_group(cls, group: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Validate every entry of a provider/API/service group."""
         results = {}
         
-        for provider, config in cls.OAUTH_PROVIDERS.items():
-            missing = []
-            invalid = []
-            
-            for var in config['vars']:
-                value = os.getenv(var)
-                if not value:
-                    missing.append(var)
-                elif 'CLIENT_ID' in var and not cls._is_valid_client_id(value):
-                    invalid.append(f"{var}: Invalid client ID format")
-            
-            results[provider] = {
+        for key, config in group.items():
+            missing, invalid = cls._check_vars(config['vars'])
+            results[key] = {
                 'name': config['name'],
                 'enabled': len(missing) == 0,
                 'missing': missing,
@@ -144,86 +214,56 @@ class EnvironmentValidator:
         
         return results
     
+    @classmethod
+    def validate_livekit_config(cls) -> Dict[str, Any]:
+        """Validate LiveKit configuration."""
+        missing, invalid = cls._check_vars(cls.LIVEKIT_VARS)
+        
+        return {
+            'enabled': len(missing) == 0,
+            'missing': missing,
+            'invalid': invalid
+        }
+    
+    @classmethod
+    def validate_oauth_providers(cls) -> Dict[str, Dict[str, Any]]:
+        """Validate OAuth provider configurations."""
+        return cls._validate_group(cls.OAUTH_PROVIDERS)
+    
     @classmethod
     def validate_google_cloud_apis(cls) -> Dict[str, Dict[str, Any]]:
         """Validate Google Cloud API configurations."""
-        results = {}
-        
-        for api, config in cls.GOOGLE_CLOUD_APIS.items():
-            missing = []
-            invalid = []
-            
-            for var in config['vars']:
-                value = os.getenv(var)
-                if not value:
-                    missing.append(var)
-                elif 'API_KEY' in var and not cls._is_valid_api_key(value):
-                    invalid.append(f"{var}: Invalid API key format")
-            
-            results[api] = {
-                'name': config['name'],
-                'enabled': len(missing) == 0,
-                'missing': missing,
-                'invalid': invalid
-            }
-        
-        return results
+        return cls._validate_group(cls.GOOGLE_CLOUD_APIS)
     
     @classmethod
     def validate_optional_services(cls) -> Dict[str, Dict[str, Any]]:
         """Validate optional service configurations."""
-        results = {}
-        
-        for service, config in cls.OPTIONAL_SERVICES.items():
-            missing = []
-            invalid = []
-            
-            for var in config['vars']:
-                value = os.getenv(var)
-                if not value:
-                    missing.append(var)
-                else:
-                    # Specific validations
-                    if var == 'REDIS_URL' and not cls._is_valid_redis_url(value):
-                        invalid.append(f"{var}: Invalid Redis URL format")
-                    elif var == 'SENTRY_DSN' and not cls._is_valid_sentry_dsn(value):
-                        invalid.append(f"{var}: Invalid Sentry DSN format")
-                    elif 'EMAIL' in var.upper() and '@' in var and not cls._is_valid_email(value):
-                        invalid.append(f"{var}: Invalid email format")
-            
-            results[service] = {
-                'name': config['name'],
-                'enabled': len(missing) == 0,
-                'missing': missing,
-                'invalid': invalid
-            }
-        
-        return results
+        return cls._validate_group(cls.OPTIONAL_SERVICES)
     
     @classmethod
     def validate_database_config(cls) -> Dict[str, Any]:
         """Validate database configuration."""
-        database_url = os.getenv('DATABASE_URL', 'sqlite:///wine_chat.db')
+        database_url = cls._env().get('DATABASE_URL', 'sqlite:///wine_chat.db')
+        
+        # SQLite needs no host/port parsing; keep the path as urlparse would
+        if database_url.startswith('sqlite://'):
+            return {'valid': True, 'type': 'sqlite', 'path': database_url[9:]}
+        
+        if not database_url.startswith(_SERVER_DB_PREFIXES):
+            return {
+                'valid': False,
+                'error': f"Unsupported database scheme: {database_url.partition(':')[0]}"
+            }
         
         try:
             parsed = urlparse(database_url)
-            
-            if parsed.scheme not in ['sqlite', 'postgresql', 'mysql']:
-                return {
-                    'valid': False,
-                    'error': f"Unsupported database scheme: {parsed.scheme}"
-                }
-            
-            if parsed.scheme == 'sqlite':
-                return {'valid': True, 'type': 'sqlite', 'path': parsed.path}
-            else:
-                return {
-                    'valid': True,
-                    'type': parsed.scheme,
-                    'host': parsed.hostname,
-                    'port': parsed.port,
-                    'database': parsed.path.lstrip('/')
-                }
+            return {
+                'valid': True,
+                'type': parsed.scheme,
+                'host': parsed.hostname,
+                'port': parsed.port,
+                'database': parsed.path.lstrip('/')
+            }
         
         except Exception as e:
             return {
@@ -234,34 +274,25 @@ class EnvironmentValidator:
     @classmethod
     def validate_security_config(cls) -> Dict[str, Any]:
         """Validate security-related configuration."""
+        env = cls._env()
         issues = []
         
         # Check secret key strength
-        secret_key = os.getenv('SECRET_KEY', '')
+        secret_key = env.get('SECRET_KEY', '')
         if len(secret_key) < 32:
             issues.append("SECRET_KEY should be at least 32 characters long")
         
-        jwt_secret = os.getenv('JWT_SECRET_KEY', '')
+        jwt_secret = env.get('JWT_SECRET_KEY', '')
         if len(jwt_secret) < 32:
             issues.append("JWT_SECRET_KEY should be at least 32 characters long")
         
         # Check for default/weak keys
-        weak_keys = [
-            'dev-secret-key',
-            'change-in-production',
-            'your_secret_key',
-            'secret',
-            '123456'
-        ]
-        
-        for key in [secret_key, jwt_secret]:
-            if any(weak in key.lower() for weak in weak_keys):
-                issues.append("Detected weak or default secret key")
-                break
+        if any(_WEAK_KEY_RE.search(key) for key in (secret_key, jwt_secret)):
+            issues.append("Detected weak or default secret key")
         
         # Check environment
-        environment = os.getenv('ENVIRONMENT', 'development')
-        debug = os.getenv('DEBUG', 'False').lower() == 'true'
+        environment = env.get('ENVIRONMENT', 'development')
+        debug = env.get('DEBUG', 'False').lower() == 'true'
         
         if environment == 'production' and debug:
             issues.append("DEBUG should be False in production environment")
@@ -274,12 +305,35 @@ class EnvironmentValidator:
         }
     
     @classmethod
-    def get_comprehensive_report(cls) -> Dict[str, Any]:
-        """Get a comprehensive validation report."""
+    def get_comprehensive_report(cls, max_age: float = 30.0, fast_fail: bool = False) -> Dict[str, Any]:
+        """
+        Get a comprehensive validation report.
+        
+        A report computed within the last max_age seconds is returned as-is
+        (shared, do not mutate); pass max_age=0 to force a fresh one.
+        With fast_fail, missing required variables return a partial critical
+        report right away, which is not cached.
+        """
+        cached = cls._report_cache
+        if cached and time.monotonic() - cached[0] < max_age:
+            return cached[1]
+        
+        # Start from a fresh snapshot, taken once for all the validators below
+        cls.invalidate_cache()
+        
+        missing_required = cls.validate_required_vars()
+        if fast_fail and missing_required:
+            return {
+                'timestamp': cls._get_timestamp(),
+                'overall_status': 'critical',
+                'required_vars': missing_required,
+                'critical_issues': list(missing_required)
+            }
+        
         report = {
             'timestamp': cls._get_timestamp(),
             'overall_status': 'unknown',
-            'required_vars': cls.validate_required_vars(),
+            'required_vars': missing_required,
             'livekit': cls.validate_livekit_config(),
             'oauth_providers': cls.validate_oauth_providers(),
             'google_cloud_apis': cls.validate_google_cloud_apis(),
@@ -318,6 +372,7 @@ class EnvironmentValidator:
         else:
             report['overall_status'] = 'good'
         
+        cls._report_cache = (time.monotonic(), report)
         return report
     
     @classmethod
@@ -325,74 +380,80 @@ class EnvironmentValidator:
         """Print a formatted validation report."""
         report = cls.get_comprehensive_report()
         
-        print("\n" + "="*60)
-        print("🍷 WINE CHAT - ENVIRONMENT VALIDATION REPORT")
-        print("="*60)
+        # Build the whole report first and write it to stdout in one go
+        buf = io.StringIO()
+        
+        print("\n" + "="*60, file=buf)
+        print("🍷 WINE CHAT - ENVIRONMENT VALIDATION REPORT", file=buf)
+        print("="*60, file=buf)
         
         # Overall status
         status_emoji = "✅" if report['overall_status'] == 'good' else "❌"
-        print(f"\n{status_emoji} Overall Status: {report['overall_status'].upper()}")
+        print(f"\n{status_emoji} Overall Status: {report['overall_status'].upper()}", file=buf)
         
         if report['overall_status'] == 'critical':
-            print("\n🚨 CRITICAL ISSUES:")
+            print("\n🚨 CRITICAL ISSUES:", file=buf)
             for issue in report.get('critical_issues', []):
-                print(f"   • {issue}")
+                print(f"   • {issue}", file=buf)
         
         # Required variables
         if report['required_vars']:
-            print(f"\n❌ Missing Required Variables:")
+            print(f"\n❌ Missing Required Variables:", file=buf)
             for var in report['required_vars']:
-                print(f"   • {var}")
+                print(f"   • {var}", file=buf)
         else:
-            print(f"\n✅ All required variables present")
+            print(f"\n✅ All required variables present", file=buf)
         
         # LiveKit
         livekit = report['livekit']
         status = "✅" if livekit['enabled'] else "❌"
-        print(f"\n{status} LiveKit Configuration")
+        print(f"\n{status} LiveKit Configuration", file=buf)
         if not livekit['enabled'] and detailed:
             if livekit['missing']:
-                print(f"   Missing: {', '.join(livekit['missing'])}")
+                print(f"   Missing: {', '.join(livekit['missing'])}", file=buf)
             if livekit['invalid']:
                 for invalid in livekit['invalid']:
-                    print(f"   Invalid: {invalid}")
+                    print(f"   Invalid: {invalid}", file=buf)
         
         # OAuth Providers
-        print(f"\n📱 OAuth Providers:")
+        print(f"\n📱 OAuth Providers:", file=buf)
         for provider, config in report['oauth_providers'].items():
             status = "✅" if config['enabled'] else "❌"
-            print(f"   {status} {config['name']}")
+            print(f"   {status} {config['name']}", file=buf)
             if not config['enabled'] and detailed:
                 if config['missing']:
-                    print(f"      Missing: {', '.join(config['missing'])}")
+                    print(f"      Missing: {', '.join(config['missing'])}", file=buf)
         
         # Google Cloud APIs
         if detailed:
-            print(f"\n☁️  Google Cloud APIs:")
+            print(f"\n☁️  Google Cloud APIs:", file=buf)
             for api, config in report['google_cloud_apis'].items():
                 status = "✅" if config['enabled'] else "❌"
-                print(f"   {status} {config['name']}")
+                print(f"   {status} {config['name']}", file=buf)
         
         # Database
         db = report['database']
         status = "✅" if db['valid'] else "❌"
-        print(f"\n{status} Database Configuration")
+        print(f"\n{status} Database Configuration", file=buf)
         if db['valid']:
-            print(f"   Type: {db.get('type', 'unknown')}")
+            print(f"   Type: {db.get('type', 'unknown')}", file=buf)
         elif detailed:
-            print(f"   Error: {db.get('error', 'Unknown error')}")
+            print(f"   Error: {db.get('error', 'Unknown error')}", file=buf)
         
         # Security
         security = report['security']
         status = "✅" if security['valid'] else "⚠️"
-        print(f"\n{status} Security Configuration")
-        print(f"   Environment: {security['environment']}")
-        print(f"   Debug Mode: {security['debug']}")
+        print(f"\n{status} Security Configuration", file=buf)
+        print(f"   Environment: {security['environment']}", file=buf)
+        print(f"   Debug Mode: {security['debug']}", file=buf)
         if not security['valid'] and detailed:
             for issue in security['issues']:
-                print(f"   Issue: {issue}")
+                print(f"   Issue: {issue}", file=buf)
+        
+        print("\n" + "="*60, file=buf)
         
-        print("\n" + "="*60)
+        sys.stdout.write(buf.getvalue())
+        sys.stdout.flush()
         
         return report['overall_status'] == 'good'
     
@@ -400,11 +461,10 @@ class EnvironmentValidator:
     @staticmethod
     def _is_valid_websocket_url(url: str) -> bool:
         """Validate WebSocket URL format."""
-        try:
-            parsed = urlparse(url)
-            return parsed.scheme in ['ws', 'wss'] and parsed.netloc
-        except:
+        if not url.startswith(('ws://', 'wss://')):
             return False
+        host = url[url.find('://') + 3:]
+        return bool(host) and host[0] not in '/?#'
     
     @staticmethod
     def _is_valid_client_id(client_id: str) -> bool:
@@ -419,11 +479,7 @@ class EnvironmentValidator:
     @staticmethod
     def _is_valid_redis_url(url: str) -> bool:
         """Validate Redis URL format."""
-        try:
-            parsed = urlparse(url)
-            return parsed.scheme == 'redis' and parsed.netloc
-        except:
-            return False
+        return url.startswith('redis://') and len(url) > 8 and url[8] not in '/?#'
     
     @staticmethod
     def _is_valid_sentry_dsn(dsn: str) -> bool:
@@ -433,13 +489,11 @@ class EnvironmentValidator:
     @staticmethod
     def _is_valid_email(email: str) -> bool:
         """Validate email format."""
-        pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        return re.match(pattern, email) is not None
+        return _EMAIL_RE.match(email) is not None
     
     @staticmethod
     def _get_timestamp() -> str:
         """Get current timestamp."""
-        from datetime import datetime
         return datetime.now().isoformat()
 
 def validate_environment_on_startup() -> bool:
@@ -448,7 +502,7 @@ def validate_environment_on_startup() -> bool:
 
 def quick_validation_check() -> bool:
     """Quick validation check without detailed output."""
-    report = EnvironmentValidator.get_comprehensive_report()
+    report = EnvironmentValidator.get_comprehensive_report(fast_fail=True)
     return report['overall_status'] == 'good'
 
 if __name__ == "__main__":
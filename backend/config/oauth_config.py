@@ -1,34 +1,54 @@
 """
 OAuth provider configuration and management.
 """
+import base64
+import hashlib
 import os
+import secrets
+import time
+from collections import OrderedDict
+from functools import cached_property, lru_cache
+import orjson
 from typing import Dict, Any, Optional, List
-from config.settings import Config
+from config.settings import Config, OAUTH_STATIC
+from utils.redis_client import get_redis
 
 class OAuthConfig:
     """OAuth provider configuration management."""
     
+    # Base URL used to build redirect URIs, read once
+    _BACKEND_URL = os.getenv('BACKEND_URL', 'http://localhost:8000')
+    
+    # Provider name -> config builder method
+    _BUILDERS = {
+        'google': '_get_google_config',
+        'twitter': '_get_twitter_config',
+        'line': '_get_line_config'
+    }
+    
+    # Built provider configs; shared between callers, so they must not be mutated
+    _cache: Dict[str, Optional[Dict[str, Any]]] = {}
+    
     @classmethod
     def get_provider_config(cls, provider: str) -> Optional[Dict[str, Any]]:
         """Get configuration for a specific OAuth provider."""
-        configs = {
-            'google': cls._get_google_config(),
-            'twitter': cls._get_twitter_config(),
-            'line': cls._get_line_config()
-        }
+        provider = provider.lower()
+        
+        if provider not in cls._cache:
+            builder = cls._BUILDERS.get(provider)
+            if builder is None:
+                return None
+            cls._cache[provider] = getattr(cls, builder)()
         
-        return configs.get(provider.lower())
+        return cls._cache[provider]
     
     @classmethod
     def get_all_providers(cls) -> Dict[str, Dict[str, Any]]:
         """Get all available OAuth provider configurations."""
-        return {
-            'google': cls._get_google_config(),
-            'twitter': cls._get_twitter_config(),
-            'line': cls._get_line_config()
-        }
+        return {name: cls.get_provider_config(name) for name in cls._BUILDERS}
     
     @classmethod
+    @lru_cache(maxsize=None)
     def get_enabled_providers(cls) -> Dict[str, Dict[str, Any]]:
         """Get only enabled OAuth providers."""
         all_providers = cls.get_all_providers()
@@ -38,6 +58,21 @@ class OAuthConfig:
             if config and config.get('enabled', False)
         }
     
+    @cached_property
+    def status_snapshot(self) -> Dict[str, Any]:
+        """Provider configuration status for the debug endpoint, built once."""
+        google_config = self.get_provider_config('google')
+        
+        return {
+            "google_client_id_set": bool(Config.GOOGLE_CLIENT_ID),
+            "google_client_secret_set": bool(Config.GOOGLE_CLIENT_SECRET),
+            "google_client_id_length": len(Config.GOOGLE_CLIENT_ID) if Config.GOOGLE_CLIENT_ID else 0,
+            "google_config_exists": google_config is not None,
+            "google_config_enabled": google_config.get('enabled') if google_config else False,
+            "all_providers": list(self.get_all_providers()),
+            "enabled_providers": list(self.get_enabled_providers())
+        }
+    
     @classmethod
     def _get_google_config(cls) -> Optional[Dict[str, Any]]:
         """Get Google OAuth configuration."""
@@ -47,22 +82,20 @@ class OAuthConfig:
         if not client_id or not client_secret:
             return None
         
-        return {
+        config = {
             'enabled': True,
             'provider_name': 'google',
             'display_name': 'Google',
             'client_id': client_id,
             'client_secret': client_secret,
-            'scope': ['openid', 'email', 'profile'],
-            'authorize_url': 'https://accounts.google.com/o/oauth2/auth',
-            'token_url': 'https://oauth2.googleapis.com/token',
-            'userinfo_url': 'https://www.googleapis.com/oauth2/v2/userinfo',
-            'revoke_url': 'https://oauth2.googleapis.com/revoke',
-            'redirect_uri': f"{os.getenv('BACKEND_URL', 'http://localhost:8000')}/api/auth/google/callback",
+            **OAUTH_STATIC['google'],
+            'redirect_uri': f"{cls._BACKEND_URL}/api/auth/google/callback",
             'response_type': 'code',
             'access_type': 'offline',
             'prompt': 'consent'
         }
+        
+        return cls._with_static_auth_params(config, 'access_type', 'prompt')
     
     @classmethod
     def _get_twitter_config(cls) -> Optional[Dict[str, Any]]:
@@ -74,22 +107,20 @@ class OAuthConfig:
         if not client_id or not client_secret:
             return None
         
-        return {
+        config = {
             'enabled': True,
             'provider_name': 'twitter',
             'display_name': 'X (Twitter)',
             'client_id': client_id,
             'client_secret': client_secret,
             'bearer_token': bearer_token,
-            'scope': ['tweet.read', 'users.read', 'offline.access'],
-            'authorize_url': 'https://twitter.com/i/oauth2/authorize',
-            'token_url': 'https://api.twitter.com/2/oauth2/token',
-            'userinfo_url': 'https://api.twitter.com/2/users/me',
-            'revoke_url': 'https://api.twitter.com/2/oauth2/revoke',
-            'redirect_uri': f"{os.getenv('BACKEND_URL', 'http://localhost:8000')}/api/auth/twitter/callback",
+            **OAUTH_STATIC['twitter'],
+            'redirect_uri': f"{cls._BACKEND_URL}/api/auth/twitter/callback",
             'response_type': 'code',
             'code_challenge_method': 'S256'  # PKCE required for Twitter OAuth 2.0
         }
+        
+        return cls._with_static_auth_params(config)
     
     @classmethod
     def _get_line_config(cls) -> Optional[Dict[str, Any]]:
@@ -100,20 +131,30 @@ class OAuthConfig:
         if not client_id or not client_secret:
             return None
         
-        return {
+        config = {
             'enabled': True,
             'provider_name': 'line',
             'display_name': 'LINE',
             'client_id': client_id,
             'client_secret': client_secret,
-            'scope': ['profile', 'openid'],
-            'authorize_url': 'https://access.line.me/oauth2/v2.1/authorize',
-            'token_url': 'https://api.line.me/oauth2/v2.1/token',
-            'userinfo_url': 'https://api.line.me/v2/profile',
-            'revoke_url': 'https://api.line.me/oauth2/v2.1/revoke',
-            'redirect_uri': f"{os.getenv('BACKEND_URL', 'http://localhost:8000')}/api/auth/line/callback",
+            **OAUTH_STATIC['line'],
+            'redirect_uri': f"{cls._BACKEND_URL}/api/auth/line/callback",
             'response_type': 'code'
         }
+        
+        return cls._with_static_auth_params(config)
+    
+    @staticmethod
+    def _with_static_auth_params(config: Dict[str, Any], *provider_keys: str) -> Dict[str, Any]:
+        """Precompute the state-independent authorization params."""
+        config['static_auth_params'] = {
+            'client_id': config['client_id'],
+            'redirect_uri': config['redirect_uri'],
+            'response_type': config['response_type'],
+            'scope': config['scope_str'],
+            **{key: config[key] for key in provider_keys}
+        }
+        return config
     
     @classmethod
     def validate_provider_config(cls, provider: str) -> Dict[str, Any]:
@@ -153,29 +194,16 @@ class OAuthConfig:
         
         from urllib.parse import urlencode
         
-        params = {
-            'client_id': config['client_id'],
-            'redirect_uri': config['redirect_uri'],
-            'response_type': config['response_type'],
-            'scope': ' '.join(config['scope']),
-            'state': state
-        }
+        params = dict(config['static_auth_params'])
+        params['state'] = state
         
-        # Provider-specific parameters
-        if provider == 'google':
-            params.update({
-                'access_type': config.get('access_type', 'offline'),
-                'prompt': config.get('prompt', 'consent')
-            })
-        elif provider == 'twitter':
+        if provider == 'twitter':
             # Twitter OAuth 2.0 with PKCE
             code_verifier = kwargs.get('code_verifier')
             code_challenge = kwargs.get('code_challenge')
             if code_verifier and code_challenge:
-                params.update({
-                    'code_challenge': code_challenge,
-                    'code_challenge_method': config.get('code_challenge_method', 'S256')
-                })
+                params['code_challenge'] = code_challenge
+                params['code_challenge_method'] = config.get('code_challenge_method', 'S256')
         
         # Add any additional parameters
         params.update(kwargs.get('extra_params', {}))
@@ -200,59 +228,79 @@ class OAuthConfig:
 class OAuthStateManager:
     """Manage OAuth state tokens for security."""
     
+    # State lifetime in seconds and upper bound on stored states
+    STATE_TTL = 300
+    MAX_STATES = 10_000
+    
+    # Redis key prefix for shared state storage
+    REDIS_PREFIX = 'oauth:state:'
+    
+    # In-memory fallback store when REDIS_URL is unset (single worker only)
+    _state_store: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+    
     @staticmethod
     def generate_state() -> str:
-        """Generate a secure state token."""
-        import secrets
-        return secrets.token_urlsafe(32)
+        """Generate a secure state token (same format as secrets.token_urlsafe(32))."""
+        return base64.urlsafe_b64encode(os.urandom(32)).rstrip(b'=').decode('ascii')
     
     @staticmethod
     def generate_code_verifier() -> str:
         """Generate PKCE code verifier."""
-        import secrets
         return secrets.token_urlsafe(32)
     
     @staticmethod
+    @lru_cache(maxsize=1024)
     def generate_code_challenge(code_verifier: str) -> str:
-        """Generate PKCE code challenge from verifier."""
-        import hashlib
-        import base64
-        
-        digest = hashlib.sha256(code_verifier.encode('utf-8')).digest()
-        return base64.urlsafe_b64encode(digest).decode('utf-8').rstrip('=')
+        """Generate PKCE code challenge from verifier (pure, so memoized)."""
+        # A 32-byte digest always encodes to 44 chars ending in a single '='
+        digest = hashlib.sha256(code_verifier.encode('ascii')).digest()
+        return base64.urlsafe_b64encode(digest)[:-1].decode('ascii')
     
-    @staticmethod
-    def store_state(state: str, provider: str, user_data: Optional[Dict] = None) -> bool:
-        """Store OAuth state (implement with Redis or database)."""
-        import time
-        # TODO: Implement state storage
-        # For now, we'll use a simple in-memory store (not suitable for production)
-        if not hasattr(OAuthStateManager, '_state_store'):
-            OAuthStateManager._state_store = {}
+    @classmethod
+    def store_state(cls, state: str, provider: str, user_data: Optional[Dict] = None) -> bool:
+        """Store OAuth state in Redis (expired by TTL) or the in-memory store."""
+        client = get_redis()
+        if client is not None:
+            payload = orjson.dumps({
+                'provider': provider,
+                'user_data': user_data,
+                'timestamp': time.time()
+            })
+            return bool(client.set(cls.REDIS_PREFIX + state, payload, ex=cls.STATE_TTL, nx=True))
+        
+        store = cls._state_store
+        now = time.monotonic()
         
-        OAuthStateManager._state_store[state] = {
+        # States are kept in insertion order, so expired ones sit at the front
+        while store and now - next(iter(store.values()))['timestamp'] > cls.STATE_TTL:
+            store.popitem(last=False)
+        while len(store) >= cls.MAX_STATES:
+            store.popitem(last=False)
+        
+        store[state] = {
             'provider': provider,
             'user_data': user_data,
-            'timestamp': time.time()
+            'timestamp': now
         }
         
         return True
     
-    @staticmethod
-    def validate_and_consume_state(state: str) -> Optional[Dict]:
+    @classmethod
+    def validate_and_consume_state(cls, state: str) -> Optional[Dict]:
         """Validate and consume OAuth state."""
-        import time
-        
-        if not hasattr(OAuthStateManager, '_state_store'):
-            return None
+        client = get_redis()
+        if client is not None:
+            # GETDEL reads and removes atomically; Redis has already dropped expired states
+            payload = client.getdel(cls.REDIS_PREFIX + state)
+            return orjson.loads(payload) if payload else None
         
-        state_data = OAuthStateManager._state_store.pop(state, None)
+        state_data = cls._state_store.pop(state, None)
         
         if not state_data:
             return None
         
         # Check if state is expired (5 minutes)
-        if time.time() - state_data['timestamp'] > 300:
+        if time.monotonic() - state_data['timestamp'] > cls.STATE_TTL:
             return None
         
         return state_data
\ No newline at end of file
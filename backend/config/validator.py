@@ -1,21 +1,30 @@
 """
 Environment variable validation system.
 """
+import logging
 import os
 import sys
-from typing import List, Dict, Any
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple
 from config.settings import Config
 
+logger = logging.getLogger(__name__)
+
+@lru_cache(maxsize=None)
+def _env(name: str) -> Optional[str]:
+    """Read an environment variable once per process."""
+    return os.environ.get(name)
+
 class ConfigValidator:
     """Environment variable validation and checking."""
     
-    REQUIRED_VARS = [
+    REQUIRED_VARS: Tuple[str, ...] = (
         'LIVEKIT_API_KEY',
         'LIVEKIT_API_SECRET', 
         'LIVEKIT_URL',
         'SECRET_KEY',
         'JWT_SECRET_KEY'
-    ]
+    )
     
     OAUTH_REQUIRED_VARS = {
         'google': ['GOOGLE_CLIENT_ID', 'GOOGLE_CLIENT_SECRET'],
@@ -23,62 +32,83 @@ class ConfigValidator:
         'line': ['LINE_CLIENT_ID', 'LINE_CLIENT_SECRET']
     }
     
+    # Frozen views of OAUTH_REQUIRED_VARS for iteration
+    _OAUTH_ITEMS = tuple((p, tuple(v)) for p, v in OAUTH_REQUIRED_VARS.items())
+    ALL_OAUTH_VARS = frozenset(v for _, vars_needed in _OAUTH_ITEMS for v in vars_needed)
+    
+    # Report from the first validation pass; config does not change at runtime
+    _cached_report: Optional[Dict[str, Any]] = None
+    
+    @classmethod
+    def clear_cache(cls) -> None:
+        """Forget cached environment lookups (e.g. after changing os.environ in tests)."""
+        _env.cache_clear()
+    
     @classmethod
     def validate_required_vars(cls) -> List[str]:
         """Check for required environment variables."""
-        missing_vars = []
-        
-        for var in cls.REQUIRED_VARS:
-            if not os.getenv(var):
-                missing_vars.append(var)
-        
-        return missing_vars
+        return [var for var in cls.REQUIRED_VARS if not _env(var)]
     
     @classmethod
     def validate_oauth_providers(cls) -> Dict[str, Dict[str, Any]]:
         """Check OAuth provider configurations."""
         provider_status = {}
         
-        for provider, vars_needed in cls.OAUTH_REQUIRED_VARS.items():
-            missing = [var for var in vars_needed if not os.getenv(var)]
-            provider_status[provider] = {
-                'enabled': len(missing) == 0,
-                'missing_vars': missing
-            }
+        for provider, vars_needed in cls._OAUTH_ITEMS:
+            if all(_env(var) for var in vars_needed):
+                provider_status[provider] = {'enabled': True, 'missing_vars': []}
+            else:
+                provider_status[provider] = {
+                    'enabled': False,
+                    'missing_vars': [var for var in vars_needed if not _env(var)]
+                }
         
         return provider_status
     
     @classmethod
     def validate_all(cls) -> bool:
         """Comprehensive configuration validation."""
-        missing_required = cls.validate_required_vars()
-        oauth_status = cls.validate_oauth_providers()
-        
+        return cls.get_validation_report()['is_valid']
+    
+    @classmethod
+    def _summarize(cls, missing_required: List[str], oauth_status: Dict[str, Dict[str, Any]]) -> bool:
+        """Log the validation outcome and return whether the configuration is usable."""
         if missing_required:
-            print(f"❌ Missing required environment variables: {', '.join(missing_required)}")
+            logger.error("Missing required environment variables: %s", missing_required)
             return False
         
         enabled_providers = [p for p, status in oauth_status.items() if status['enabled']]
         
         if not enabled_providers:
-            print("❌ No OAuth providers are properly configured")
+            logger.error("No OAuth providers are properly configured")
             return False
         
-        print(f"✅ Configuration valid. Enabled OAuth providers: {', '.join(enabled_providers)}")
+        logger.info("Configuration valid. Enabled OAuth providers: %s", enabled_providers)
         return True
     
     @classmethod
     def get_validation_report(cls) -> Dict[str, Any]:
-        """Get detailed validation report."""
-        return {
-            'missing_required': cls.validate_required_vars(),
-            'oauth_providers': cls.validate_oauth_providers(),
-            'is_valid': cls.validate_all()
-        }
+        """Get detailed validation report (computed once, shared; do not mutate)."""
+        if cls._cached_report is None:
+            missing_required = cls.validate_required_vars()
+            oauth_status = cls.validate_oauth_providers()
+            cls._cached_report = {
+                'missing_required': missing_required,
+                'oauth_providers': oauth_status,
+                'is_valid': cls._summarize(missing_required, oauth_status)
+            }
+        
+        return cls._cached_report
+    
+    @classmethod
+    def invalidate(cls) -> None:
+        """Drop the cached report and environment lookups."""
+        cls._cached_report = None
+        cls.clear_cache()
 
 def validate_config_on_startup():
     """Validate configuration on application startup."""
-    if not ConfigValidator.validate_all():
-        print("Configuration validation failed. Please check your environment variables.")
+    if not ConfigValidator.get_validation_report()['is_valid']:
+        logger.error("Configuration validation failed. Please check your environment variables.")
         return False
-    return True
\ No newline at end of file
+    return True
@@ -0,0 +1,42 @@
+"""Add room session lookup indexes
+
+Revision ID: 3f2a9c1d7b4e
+Revises:
+Create Date: 2026-10-15 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f2a9c1d7b4e'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The old check-then-insert in create_or_get_room could leave duplicate
+    # (wine_id, room_name) rows; keep the most recently active one of each
+    op.execute(
+        "DELETE FROM room_sessions WHERE id IN ("
+        "SELECT id FROM (SELECT id, ROW_NUMBER() OVER ("
+        "PARTITION BY wine_id, room_name "
+        "ORDER BY CASE WHEN last_activity IS NULL THEN 1 ELSE 0 END, last_activity DESC, id DESC"
+        ") AS rn FROM room_sessions) ranked WHERE rn > 1)"
+    )
+
+    # Tables created by init_database() may already have some of these
+    op.create_index(
+        'uq_room_sessions_wine_id_room_name', 'room_sessions',
+        ['wine_id', 'room_name'], unique=True, if_not_exists=True
+    )
+    op.create_index('ix_room_sessions_room_name', 'room_sessions', ['room_name'], if_not_exists=True)
+    op.create_index('ix_room_sessions_last_activity', 'room_sessions', ['last_activity'], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_room_sessions_last_activity', table_name='room_sessions', if_exists=True)
+    op.drop_index('ix_room_sessions_room_name', table_name='room_sessions', if_exists=True)
+    op.drop_index('uq_room_sessions_wine_id_room_name', table_name='room_sessions', if_exists=True)
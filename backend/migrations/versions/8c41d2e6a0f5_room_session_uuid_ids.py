@@ -0,0 +1,52 @@
+"""Store room session ids as UUIDs
+
+Revision ID: 8c41d2e6a0f5
+Revises: 3f2a9c1d7b4e
+Create Date: 2026-10-15 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c41d2e6a0f5'
+down_revision = '3f2a9c1d7b4e'
+branch_labels = None
+depends_on = None
+
+# Only the column being rewritten; typed as plain text for the data updates
+room_sessions = sa.table('room_sessions', sa.column('id', sa.String()))
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        # Native uuid column; existing ids are hyphenated uuid4 strings
+        op.execute("ALTER TABLE room_sessions ALTER COLUMN id TYPE uuid USING id::uuid")
+        return
+
+    # Elsewhere Uuid is stored as 32-char lowercase hex; rewrite the
+    # hyphenated ids so primary-key binds match existing rows
+    op.execute(
+        "UPDATE room_sessions SET id = lower(replace(id, '-', '')) "
+        "WHERE length(id) = 36"
+    )
+    if op.get_bind().dialect.name != 'sqlite':
+        op.alter_column('room_sessions', 'id', type_=sa.CHAR(32), existing_type=sa.String(), existing_nullable=False)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("ALTER TABLE room_sessions ALTER COLUMN id TYPE varchar USING id::text")
+        return
+
+    if op.get_bind().dialect.name != 'sqlite':
+        op.alter_column('room_sessions', 'id', type_=sa.String(36), existing_type=sa.CHAR(32), existing_nullable=False)
+    # Rebuild the hyphenated form; concat() renders per dialect
+    part = lambda start, length: sa.func.substr(room_sessions.c.id, start, length)
+    op.execute(
+        room_sessions.update()
+        .where(sa.func.length(room_sessions.c.id) == 32)
+        .values(id=part(1, 8).concat('-').concat(part(9, 4)).concat('-').concat(part(13, 4))
+                .concat('-').concat(part(17, 4)).concat('-').concat(part(21, 12)))
+    )
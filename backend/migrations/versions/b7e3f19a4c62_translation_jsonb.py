@@ -0,0 +1,52 @@
+"""Store translation maps as jsonb with a GIN index on wine names
+
+Revision ID: b7e3f19a4c62
+Revises: 8c41d2e6a0f5
+Create Date: 2026-10-15 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e3f19a4c62'
+down_revision = '8c41d2e6a0f5'
+branch_labels = None
+depends_on = None
+
+# (table, column) pairs using the JSON/JSONB variant type
+TRANSLATION_COLUMNS = (
+    ('wines', 'name_translations'),
+    ('wines', 'tasting_notes_translations'),
+    ('wines', 'region_translations'),
+    ('voice_profiles', 'description_translations'),
+)
+
+
+def upgrade() -> None:
+    # Other dialects keep plain JSON
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    for table_name, column_name in TRANSLATION_COLUMNS:
+        op.execute(
+            f"ALTER TABLE {table_name} ALTER COLUMN {column_name} "
+            f"TYPE jsonb USING {column_name}::jsonb"
+        )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_wine_name_translations_gin "
+        "ON wines USING gin (name_translations)"
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute("DROP INDEX IF EXISTS ix_wine_name_translations_gin")
+    for table_name, column_name in TRANSLATION_COLUMNS:
+        op.execute(
+            f"ALTER TABLE {table_name} ALTER COLUMN {column_name} "
+            f"TYPE json USING {column_name}::json"
+        )
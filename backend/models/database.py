@@ -1,35 +1,61 @@
 """
 Database configuration and session management.
 """
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import StaticPool
+from contextlib import contextmanager
+from typing import Iterator
+from sqlalchemy import create_engine, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import DeclarativeBase, sessionmaker, Session
+from sqlalchemy.pool import QueuePool, StaticPool
 from config.settings import get_config
 
 config = get_config()
 
 # Database engine configuration
-if config.DATABASE_URL.startswith('sqlite'):
-    # SQLite configuration with connection pooling
+if ':memory:' in config.DATABASE_URL:
+    # In-memory SQLite exists only inside one connection, so share it
     engine = create_engine(
         config.DATABASE_URL,
         connect_args={"check_same_thread": False},
         poolclass=StaticPool,
         echo=config.DEBUG
     )
+elif config.DATABASE_URL.startswith('sqlite'):
+    # File-backed SQLite: pool connections instead of funnelling every request through one
+    engine = create_engine(
+        config.DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        poolclass=QueuePool,
+        pool_size=10,
+        max_overflow=20,
+        echo=config.DEBUG
+    )
 else:
-    # PostgreSQL or other database configuration
+    # PostgreSQL or other database configuration; sized for the API's
+    # worker thread pool so sync endpoints rarely wait on a checkout
     engine = create_engine(
         config.DATABASE_URL,
+        pool_size=25,
+        max_overflow=25,
+        pool_pre_ping=True,
+        pool_recycle=1800,
         echo=config.DEBUG
     )
 
 # Session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Dialects whose INSERT supports ON CONFLICT ... RETURNING; other
+# dialects fall back to ORM queries
+UPSERT_INSERTS = {
+    'postgresql': pg_insert,
+    'sqlite': sqlite_insert
+}
+
 # Base class for all models
-Base = declarative_base()
+class Base(DeclarativeBase):
+    pass
 
 def get_db() -> Session:
     """Get database session."""
@@ -39,10 +65,71 @@ def get_db() -> Session:
     finally:
         db.close()
 
+@contextmanager
+def db_session() -> Iterator[Session]:
+    """
+    Database session for service code; rolled back on error, always closed.
+    
+    Callers commit explicitly, so objects returned from the block keep
+    their loaded attributes after the session closes.
+    """
+    db = SessionLocal()
+    try:
+        yield db
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
 def init_database():
     """Initialize database tables."""
+    # Register every table on Base, even when run from the CLI
+    import models.user, models.wine  # noqa: F401
     Base.metadata.create_all(bind=engine)
 
+# Indexes on hot filter/join columns; create_all only adds indexes for new
+# tables, so existing databases get them here
+# (names follow SQLAlchemy's ix_<table>_<column> convention)
+HOT_PATH_INDEXES = (
+    ('ix_oauth_providers_user_id', 'oauth_providers', 'user_id'),
+    ('ix_translation_settings_user_id', 'translation_settings', 'user_id'),
+    ('ix_room_sessions_room_name', 'room_sessions', 'room_name'),
+    ('ix_room_sessions_wine_id', 'room_sessions', 'wine_id'),
+    ('ix_room_sessions_last_activity', 'room_sessions', 'last_activity'),
+)
+
+# Unique indexes that ON CONFLICT targets rely on:
+# (name, table, columns, column deciding which duplicate is kept, newest wins)
+UNIQUE_INDEXES = (
+    ('uq_room_sessions_wine_id_room_name', 'room_sessions', 'wine_id, room_name', 'last_activity'),
+)
+
+def _dedupe_sql(table_name: str, columns: str, newest_by: str) -> str:
+    """DELETE keeping one row per columns value: the newest by newest_by (NULLs last), then highest id."""
+    return (
+        f"DELETE FROM {table_name} WHERE id IN ("
+        f"SELECT id FROM (SELECT id, ROW_NUMBER() OVER ("
+        f"PARTITION BY {columns} "
+        f"ORDER BY CASE WHEN {newest_by} IS NULL THEN 1 ELSE 0 END, {newest_by} DESC, id DESC"
+        f") AS rn FROM {table_name}) ranked WHERE rn > 1)"
+    )
+
+def ensure_indexes():
+    """Create missing hot-path and unique indexes and refresh planner statistics."""
+    with engine.begin() as connection:
+        for index_name, table_name, column_name in HOT_PATH_INDEXES:
+            connection.execute(text(
+                f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} ({column_name})"
+            ))
+        for index_name, table_name, columns, newest_by in UNIQUE_INDEXES:
+            # Older check-then-insert code could leave duplicates behind
+            connection.execute(text(_dedupe_sql(table_name, columns, newest_by)))
+            connection.execute(text(
+                f"CREATE UNIQUE INDEX IF NOT EXISTS {index_name} ON {table_name} ({columns})"
+            ))
+        connection.execute(text("ANALYZE"))
+
 def drop_database():
     """Drop all database tables (for testing)."""
     Base.metadata.drop_all(bind=engine)
\ No newline at end of file
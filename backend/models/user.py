@@ -1,8 +1,9 @@
 """
 User and OAuth provider models.
 """
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Boolean, Float, JSON, Text, UniqueConstraint
-from sqlalchemy.orm import relationship
+from typing import List, Optional
+from sqlalchemy import String, Integer, DateTime, ForeignKey, Boolean, Float, UniqueConstraint, Index
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 from datetime import datetime
 from models.database import Base
@@ -11,17 +12,17 @@ class User(Base):
     """User model with multi-language support."""
     __tablename__ = 'users'
     
-    id = Column(String, primary_key=True)
-    email = Column(String, unique=True, nullable=False)
-    name = Column(String, nullable=False)
-    main_language = Column(String, default='ja')  # UI language setting
-    profile_image_url = Column(String)
-    created_at = Column(DateTime, default=func.now())
-    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    id: Mapped[str] = mapped_column(String, primary_key=True)
+    email: Mapped[str] = mapped_column(String, unique=True)
+    name: Mapped[str] = mapped_column(String)
+    main_language: Mapped[Optional[str]] = mapped_column(String, default='ja')  # UI language setting
+    profile_image_url: Mapped[Optional[str]] = mapped_column(String)
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime, default=func.now())
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime, default=func.now(), onupdate=func.now())
     
     # Relationships
-    oauth_providers = relationship("OAuthProvider", back_populates="user", cascade="all, delete-orphan")
-    translation_settings = relationship("TranslationSettings", back_populates="user", uselist=False, cascade="all, delete-orphan")
+    oauth_providers: Mapped[List["OAuthProvider"]] = relationship(back_populates="user", cascade="all, delete-orphan")
+    translation_settings: Mapped[Optional["TranslationSettings"]] = relationship(back_populates="user", cascade="all, delete-orphan")
     
     def __repr__(self):
         return f"<User(id='{self.id}', email='{self.email}', name='{self.name}')>"
@@ -30,17 +31,20 @@ class OAuthProvider(Base):
     """OAuth provider information for users."""
     __tablename__ = 'oauth_providers'
     
-    id = Column(Integer, primary_key=True)
-    user_id = Column(String, ForeignKey('users.id'), nullable=False)
-    provider_name = Column(String, nullable=False)  # 'google', 'twitter', 'line'
-    provider_user_id = Column(String, nullable=False)
-    provider_email = Column(String)
-    linked_at = Column(DateTime, default=func.now())
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[str] = mapped_column(String, ForeignKey('users.id'))
+    provider_name: Mapped[str] = mapped_column(String)  # 'google', 'twitter', 'line'
+    provider_user_id: Mapped[str] = mapped_column(String)
+    provider_email: Mapped[Optional[str]] = mapped_column(String)
+    linked_at: Mapped[Optional[datetime]] = mapped_column(DateTime, default=func.now())
     
     # Relationships
-    user = relationship("User", back_populates="oauth_providers")
+    user: Mapped["User"] = relationship(back_populates="oauth_providers")
     
-    __table_args__ = (UniqueConstraint('provider_name', 'provider_user_id'),)
+    __table_args__ = (
+        UniqueConstraint('provider_name', 'provider_user_id'),
+        Index('ix_oauth_providers_user_id', 'user_id'),  # /me and link/unlink lookups
+    )
     
     def __repr__(self):
         return f"<OAuthProvider(provider='{self.provider_name}', user_id='{self.user_id}')>"
@@ -49,28 +53,28 @@ class TranslationSettings(Base):
     """User translation preferences and settings."""
     __tablename__ = 'translation_settings'
     
-    id = Column(Integer, primary_key=True)
-    user_id = Column(String, ForeignKey('users.id'), nullable=False)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[str] = mapped_column(String, ForeignKey('users.id'))
     
     # Translation feature toggles
-    text_translation_enabled = Column(Boolean, default=True)
-    voice_translation_enabled = Column(Boolean, default=False)
+    text_translation_enabled: Mapped[Optional[bool]] = mapped_column(Boolean, default=True)
+    voice_translation_enabled: Mapped[Optional[bool]] = mapped_column(Boolean, default=False)
     
     # Audio settings
-    original_voice_volume = Column(Float, default=0.3)  # Original audio volume (0.0-1.0)
-    translated_voice_volume = Column(Float, default=0.8)  # Translated audio volume
+    original_voice_volume: Mapped[Optional[float]] = mapped_column(Float, default=0.3)  # Original audio volume (0.0-1.0)
+    translated_voice_volume: Mapped[Optional[float]] = mapped_column(Float, default=0.8)  # Translated audio volume
     
     # Voice configuration
-    preferred_voice_id = Column(String)  # User selected voice ID
-    voice_speed = Column(Float, default=1.0)  # Voice playback speed
+    preferred_voice_id: Mapped[Optional[str]] = mapped_column(String)  # User selected voice ID
+    voice_speed: Mapped[Optional[float]] = mapped_column(Float, default=1.0)  # Voice playback speed
     
     # Display settings
-    subtitle_position = Column(String, default='bottom')  # 'top', 'bottom', 'overlay'
-    subtitle_font_size = Column(Integer, default=16)
-    subtitle_background_opacity = Column(Float, default=0.7)
+    subtitle_position: Mapped[Optional[str]] = mapped_column(String, default='bottom')  # 'top', 'bottom', 'overlay'
+    subtitle_font_size: Mapped[Optional[int]] = mapped_column(Integer, default=16)
+    subtitle_background_opacity: Mapped[Optional[float]] = mapped_column(Float, default=0.7)
     
     # Relationships
-    user = relationship("User", back_populates="translation_settings")
+    user: Mapped["User"] = relationship(back_populates="translation_settings")
     
     def __repr__(self):
         return f"<TranslationSettings(user_id='{self.user_id}')>"
\ No newline at end of file
@@ -1,50 +1,62 @@
 """
 Wine and room-related models.
 """
-from sqlalchemy import Column, String, Integer, Float, JSON, DateTime, ForeignKey, Text
-from sqlalchemy.orm import relationship
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import String, Integer, Float, JSON, DateTime, ForeignKey, Text, Index, Uuid
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
+from types import MappingProxyType
 from models.database import Base
 
+# Shared read-only fallback for unset translation maps
+_EMPTY = MappingProxyType({})
+
+# Binary JSON on PostgreSQL (parsed once on write, GIN-indexable); plain JSON elsewhere
+_TRANSLATION_JSON = JSON().with_variant(JSONB(), 'postgresql')
+
 class Wine(Base):
     """Wine model with multilingual support."""
     __tablename__ = 'wines'
     
-    id = Column(String, primary_key=True)
-    name = Column(String, nullable=False)
-    vintage = Column(Integer)
-    region = Column(String)
-    producer = Column(String)
-    wine_type = Column(String)  # 'red', 'white', 'sparkling', etc.
-    alcohol_content = Column(Float)
-    image_url = Column(String)
+    id: Mapped[str] = mapped_column(String, primary_key=True)
+    name: Mapped[str] = mapped_column(String)
+    vintage: Mapped[Optional[int]] = mapped_column(Integer)
+    region: Mapped[Optional[str]] = mapped_column(String)
+    producer: Mapped[Optional[str]] = mapped_column(String)
+    wine_type: Mapped[Optional[str]] = mapped_column(String)  # 'red', 'white', 'sparkling', etc.
+    alcohol_content: Mapped[Optional[float]] = mapped_column(Float)
+    image_url: Mapped[Optional[str]] = mapped_column(String)
     
     # Multilingual support
-    name_translations = Column(JSON)  # {'ja': '日本語名', 'en': 'English name'}
-    tasting_notes_translations = Column(JSON)  # Multilingual tasting notes
-    region_translations = Column(JSON)  # Region names in multiple languages
+    name_translations: Mapped[Optional[Dict[str, str]]] = mapped_column(_TRANSLATION_JSON)  # {'ja': '日本語名', 'en': 'English name'}
+    tasting_notes_translations: Mapped[Optional[Dict[str, str]]] = mapped_column(_TRANSLATION_JSON)  # Multilingual tasting notes
+    region_translations: Mapped[Optional[Dict[str, str]]] = mapped_column(_TRANSLATION_JSON)  # Region names in multiple languages
     
     # Recognition related
-    recognition_keywords = Column(JSON)  # Keywords for recognition
-    recognition_count = Column(Integer, default=0)
+    recognition_keywords: Mapped[Optional[Any]] = mapped_column(JSON)  # Keywords for recognition
+    recognition_count: Mapped[Optional[int]] = mapped_column(Integer, default=0)
     
-    created_at = Column(DateTime, default=func.now())
-    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime, default=func.now())
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime, default=func.now(), onupdate=func.now())
     
     # Relationships
-    room_sessions = relationship("RoomSession", back_populates="wine")
+    room_sessions: Mapped[List["RoomSession"]] = relationship(back_populates="wine")
+    
+    __table_args__ = (
+        # Key/containment lookups on translated names (PostgreSQL only)
+        Index('ix_wine_name_translations_gin', 'name_translations', postgresql_using='gin').ddl_if(dialect='postgresql'),
+    )
     
     def get_localized_name(self, language: str) -> str:
         """Get wine name in specified language."""
-        if self.name_translations and language in self.name_translations:
-            return self.name_translations[language]
-        return self.name
+        return (self.name_translations or _EMPTY).get(language, self.name)
     
     def get_localized_tasting_notes(self, language: str) -> str:
         """Get tasting notes in specified language."""
-        if self.tasting_notes_translations and language in self.tasting_notes_translations:
-            return self.tasting_notes_translations[language]
-        return ''
+        return (self.tasting_notes_translations or _EMPTY).get(language, '')
     
     def __repr__(self):
         return f"<Wine(id='{self.id}', name='{self.name}', vintage={self.vintage})>"
@@ -53,15 +65,25 @@ class RoomSession(Base):
     """Video chat room sessions."""
     __tablename__ = 'room_sessions'
     
-    id = Column(String, primary_key=True)
-    wine_id = Column(String, ForeignKey('wines.id'), nullable=False)
-    room_name = Column(String, nullable=False)
-    active_participants = Column(Integer, default=0)
-    created_at = Column(DateTime, default=func.now())
-    last_activity = Column(DateTime, default=func.now())
+    # Native 16-byte UUID on PostgreSQL, CHAR(32) elsewhere; still read/written as str
+    id: Mapped[str] = mapped_column(Uuid(as_uuid=False), primary_key=True, default=lambda: str(uuid.uuid4()))
+    wine_id: Mapped[str] = mapped_column(String, ForeignKey('wines.id'))
+    room_name: Mapped[str] = mapped_column(String)
+    active_participants: Mapped[Optional[int]] = mapped_column(Integer, default=0)
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime, default=func.now())
+    last_activity: Mapped[Optional[datetime]] = mapped_column(DateTime, default=func.now())
     
     # Relationships
-    wine = relationship("Wine", back_populates="room_sessions")
+    wine: Mapped["Wine"] = relationship(back_populates="room_sessions")
+    
+    __table_args__ = (
+        # One session per wine room; also the ON CONFLICT target in create_or_get_room
+        Index('uq_room_sessions_wine_id_room_name', 'wine_id', 'room_name', unique=True),
+        # Lookups by room name alone (participant counts, room info)
+        Index('ix_room_sessions_room_name', 'room_name'),
+        # Activity cutoffs in get_active_rooms_for_wine and cleanup_inactive_rooms
+        Index('ix_room_sessions_last_activity', 'last_activity'),
+    )
     
     def __repr__(self):
         return f"<RoomSession(id='{self.id}', room_name='{self.room_name}', participants={self.active_participants})>"
@@ -70,23 +92,21 @@ class VoiceProfile(Base):
     """Available voice profiles for text-to-speech."""
     __tablename__ = 'voice_profiles'
     
-    id = Column(String, primary_key=True)
-    language = Column(String, nullable=False)  # 'ja', 'en', 'ko', etc.
-    voice_name = Column(String, nullable=False)  # 'ja-JP-Wavenet-A'
-    gender = Column(String)  # 'male', 'female', 'neutral'
-    description = Column(String)  # Voice description
-    sample_audio_url = Column(String)  # Sample audio URL
+    id: Mapped[str] = mapped_column(String, primary_key=True)
+    language: Mapped[str] = mapped_column(String)  # 'ja', 'en', 'ko', etc.
+    voice_name: Mapped[str] = mapped_column(String)  # 'ja-JP-Wavenet-A'
+    gender: Mapped[Optional[str]] = mapped_column(String)  # 'male', 'female', 'neutral'
+    description: Mapped[Optional[str]] = mapped_column(String)  # Voice description
+    sample_audio_url: Mapped[Optional[str]] = mapped_column(String)  # Sample audio URL
     
     # Multilingual descriptions
-    description_translations = Column(JSON)
+    description_translations: Mapped[Optional[Dict[str, str]]] = mapped_column(_TRANSLATION_JSON)
     
-    created_at = Column(DateTime, default=func.now())
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime, default=func.now())
     
     def get_localized_description(self, language: str) -> str:
         """Get voice description in specified language."""
-        if self.description_translations and language in self.description_translations:
-            return self.description_translations[language]
-        return self.description or ''
+        return (self.description_translations or _EMPTY).get(language, self.description or '')
     
     def __repr__(self):
         return f"<VoiceProfile(id='{self.id}', language='{self.language}', voice_name='{self.voice_name}')>"
@@ -95,16 +115,12 @@ class Translation(Base):
     """Translation key-value pairs for internationalization."""
     __tablename__ = 'translations'
     
-    id = Column(Integer, primary_key=True)
-    key = Column(String, nullable=False, index=True)  # 'wine.type.red', 'ui.button.join'
-    language = Column(String, nullable=False, index=True)  # 'ja', 'en', 'ko', etc.
-    value = Column(Text, nullable=False)
-    created_at = Column(DateTime, default=func.now())
-    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
-    
-    __table_args__ = (
-        {'sqlite_autoincrement': True},
-    )
+    # (key, language) is the natural key; its PK index also serves key-prefix lookups
+    key: Mapped[str] = mapped_column(String, primary_key=True)  # 'wine.type.red', 'ui.button.join'
+    language: Mapped[str] = mapped_column(String, primary_key=True)  # 'ja', 'en', 'ko', etc.
+    value: Mapped[str] = mapped_column(Text)
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime, default=func.now())
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime, default=func.now(), onupdate=func.now())
     
     def __repr__(self):
         return f"<Translation(key='{self.key}', language='{self.language}')>"
\ No newline at end of file
@@ -1,18 +1,25 @@
 """
 FastAPI endpoints for OAuth authentication.
 """
+from functools import lru_cache, partial
+import anyio
 from fastapi import APIRouter, HTTPException, Depends, Request, Response
 from fastapi.responses import RedirectResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Dict, Any, Optional, List
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 from services.auth_service import AuthenticationService
 from config.oauth_config import OAuthConfig
 
 
+# Request models reject unknown fields and oversized strings up front
+_REQUEST_CONFIG = ConfigDict(extra='forbid', str_max_length=2048)
+
 # Request/Response models
 class AuthUrlRequest(BaseModel):
+    model_config = _REQUEST_CONFIG
+    
     provider: str
     redirect_url: Optional[str] = None
 
@@ -37,36 +44,62 @@ class UserResponse(BaseModel):
     oauth_providers: List[Dict[str, Any]]
 
 class LinkProviderRequest(BaseModel):
+    model_config = _REQUEST_CONFIG
+    
     provider: str
     code: str
     state: str
 
 class UnlinkProviderRequest(BaseModel):
+    model_config = _REQUEST_CONFIG
+    
     provider: str
 
 class TokenRefreshResponse(BaseModel):
     token: str
 
 
+# Generic callback failure, built once; handlers return it as-is and never mutate it
+_AUTH_FAILED = AuthCallbackResponse(success=False, error="Authentication failed")
+
+
 # Create router
-auth_router = APIRouter(prefix="/api/auth", tags=["authentication"])
+auth_router = APIRouter(
+    prefix="/api/auth",
+    tags=["authentication"]
+)
 
 # Security scheme
 security = HTTPBearer()
 
-# Initialize services
-auth_service = AuthenticationService()
-oauth_config = OAuthConfig()
+# Services are built on first use rather than at import
+@lru_cache(maxsize=1)
+def get_auth_service() -> AuthenticationService:
+    """Get the shared authentication service."""
+    return AuthenticationService()
+
+
+@lru_cache(maxsize=1)
+def get_oauth_config() -> OAuthConfig:
+    """Get the shared OAuth configuration."""
+    return OAuthConfig()
 
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+def get_current_user(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
     """Dependency to get current authenticated user from JWT token."""
-    token = credentials.credentials
-    user = auth_service.get_user_by_token(token)
+    user = getattr(request.state, 'user', None)
+    if user is not None:
+        return user
+    
+    user = get_auth_service().get_user_by_token(credentials.credentials)
     
     if not user:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
     
+    request.state.user = user
     return user
 
 
@@ -74,7 +107,7 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
 async def get_available_providers() -> Dict[str, Any]:
     """Get list of available OAuth providers."""
     try:
-        providers = oauth_config.get_frontend_provider_list()
+        providers = get_oauth_config().get_frontend_provider_list()
         return {
             "success": True,
             "providers": providers
@@ -87,19 +120,7 @@ async def get_available_providers() -> Dict[str, Any]:
 async def debug_providers() -> Dict[str, Any]:
     """Debug endpoint to check provider configurations."""
     try:
-        from config.settings import Config
-        
-        google_config = oauth_config.get_provider_config('google')
-        
-        return {
-            "google_client_id_set": bool(Config.GOOGLE_CLIENT_ID),
-            "google_client_secret_set": bool(Config.GOOGLE_CLIENT_SECRET),
-            "google_client_id_length": len(Config.GOOGLE_CLIENT_ID) if Config.GOOGLE_CLIENT_ID else 0,
-            "google_config_exists": google_config is not None,
-            "google_config_enabled": google_config.get('enabled') if google_config else False,
-            "all_providers": list(oauth_config.get_all_providers().keys()),
-            "enabled_providers": list(oauth_config.get_enabled_providers().keys())
-        }
+        return get_oauth_config().status_snapshot
     except Exception as e:
         return {
             "error": str(e),
@@ -111,7 +132,7 @@ async def debug_providers() -> Dict[str, Any]:
 async def get_authorization_url(request: AuthUrlRequest) -> AuthUrlResponse:
     """Get OAuth authorization URL for a provider."""
     try:
-        result = auth_service.get_authorization_url(
+        result = get_auth_service().get_authorization_url(
             provider=request.provider,
             redirect_url=request.redirect_url
         )
@@ -124,7 +145,7 @@ async def get_authorization_url(request: AuthUrlRequest) -> AuthUrlResponse:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@auth_router.get("/{provider}/callback")
+@auth_router.get("/{provider}/callback", response_model_exclude_none=True)
 async def oauth_callback(
     provider: str,
     code: str,
@@ -139,11 +160,13 @@ async def oauth_callback(
         )
     
     try:
-        result = auth_service.handle_oauth_callback(
+        # Token exchange and userinfo are blocking HTTP calls; keep them off the event loop
+        result = await anyio.to_thread.run_sync(partial(
+            get_auth_service().handle_oauth_callback,
             provider=provider,
             code=code,
             state=state
-        )
+        ))
         
         return AuthCallbackResponse(**result)
         
@@ -152,11 +175,8 @@ async def oauth_callback(
             success=False,
             error=str(e)
         )
-    except Exception as e:
-        return AuthCallbackResponse(
-            success=False,
-            error="Authentication failed"
-        )
+    except Exception:
+        return _AUTH_FAILED
 
 
 @auth_router.post("/refresh")
@@ -165,16 +185,14 @@ async def refresh_token(
 ) -> TokenRefreshResponse:
     """Refresh JWT token."""
     try:
-        current_token = credentials.credentials
-        new_token = auth_service.refresh_jwt_token(current_token)
-        
-        if not new_token:
-            raise HTTPException(status_code=401, detail="Token refresh failed")
-        
-        return TokenRefreshResponse(token=new_token)
-        
-    except Exception as e:
+        new_token = get_auth_service().refresh_jwt_token(credentials.credentials)
+    except Exception:
+        new_token = None
+    
+    if not new_token:
         raise HTTPException(status_code=401, detail="Token refresh failed")
+    
+    return TokenRefreshResponse(token=new_token)
 
 
 @auth_router.post("/logout")
@@ -182,7 +200,7 @@ async def logout(credentials: HTTPAuthorizationCredentials = Depends(security))
     """Logout user."""
     try:
         token = credentials.credentials
-        success = auth_service.logout_user(token)
+        success = get_auth_service().logout_user(token)
         
         return {
             "success": success,
@@ -193,11 +211,12 @@ async def logout(credentials: HTTPAuthorizationCredentials = Depends(security))
         raise HTTPException(status_code=500, detail="Logout failed")
 
 
-@auth_router.get("/me", response_model=UserResponse)
+@auth_router.get("/me", response_model=UserResponse, response_model_exclude_none=True)
 async def get_current_user_info(current_user = Depends(get_current_user)) -> UserResponse:
     """Get current user information."""
     try:
-        oauth_providers = auth_service.get_user_oauth_providers(current_user.id)
+        # Loaded together with the user in get_current_user
+        oauth_providers = get_auth_service().format_oauth_providers(current_user.oauth_providers)
         
         return UserResponse(
             id=current_user.id,
@@ -219,12 +238,13 @@ async def link_oauth_provider(
 ) -> Dict[str, Any]:
     """Link additional OAuth provider to current user."""
     try:
-        success = auth_service.link_oauth_provider(
+        success = await anyio.to_thread.run_sync(partial(
+            get_auth_service().link_oauth_provider,
             user_id=current_user.id,
             provider=request.provider,
             auth_code=request.code,
             state=request.state
-        )
+        ))
         
         if not success:
             raise HTTPException(status_code=400, detail="Failed to link provider")
@@ -245,7 +265,7 @@ async def unlink_oauth_provider(
 ) -> Dict[str, Any]:
     """Unlink OAuth provider from current user."""
     try:
-        success = auth_service.unlink_oauth_provider(
+        success = get_auth_service().unlink_oauth_provider(
             user_id=current_user.id,
             provider=request.provider
         )
@@ -274,16 +294,3 @@ async def validate_token(current_user = Depends(get_current_user)) -> Dict[str,
         "email": current_user.email
     }
 
-
-# Middleware for handling CORS and security headers
-@auth_router.middleware("http")
-async def add_security_headers(request: Request, call_next):
-    """Add security headers to responses."""
-    response = await call_next(request)
-    
-    # Add security headers
-    response.headers["X-Content-Type-Options"] = "nosniff"
-    response.headers["X-Frame-Options"] = "DENY"
-    response.headers["X-XSS-Protection"] = "1; mode=block"
-    
-    return response
\ No newline at end of file
@@ -1,25 +1,33 @@
 """
 FastAPI endpoints for LiveKit room management.
 """
-from typing import Dict, List
-from fastapi import APIRouter, HTTPException, Depends, status
-from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from functools import partial
+from typing import Annotated, Dict, List
+import anyio
+from fastapi import APIRouter, HTTPException, Depends, Request, status
+from pydantic import BaseModel, StringConstraints
 
-from models.database import get_db
 from services.livekit_service import livekit_service
 from services.session_manager import get_current_user
-from models.user import User
 
-router = APIRouter(prefix="/api/rooms", tags=["rooms"])
+# Authenticated once per request at router level; handlers read request.state.user
+router = APIRouter(prefix="/api/rooms", tags=["rooms"], dependencies=[Depends(get_current_user)])
+
+# Routes open to unauthenticated guests
+guest_router = APIRouter(prefix="/api/rooms", tags=["rooms"])
+
+# Identifier shapes, checked by pydantic before any handler or DB work
+# (room names are "wine-<wine_id>")
+WineId = Annotated[str, StringConstraints(pattern=r'^[A-Za-z0-9_-]{1,64}$')]
+RoomName = Annotated[str, StringConstraints(pattern=r'^[A-Za-z0-9_-]{1,80}$')]
 
 class JoinRoomRequest(BaseModel):
     """Request model for joining a room."""
-    wine_id: str
+    wine_id: WineId
 
 class GuestJoinRoomRequest(BaseModel):
     """Request model for guest joining a room."""
-    wine_id: str
+    wine_id: WineId
     guest_name: str = ""
 
 class JoinRoomResponse(BaseModel):
@@ -32,7 +40,7 @@ class JoinRoomResponse(BaseModel):
 
 class LeaveRoomRequest(BaseModel):
     """Request model for leaving a room."""
-    room_name: str
+    room_name: RoomName
 
 class RoomInfoResponse(BaseModel):
     """Response model for room information."""
@@ -44,11 +52,7 @@ class RoomInfoResponse(BaseModel):
     last_activity: str
 
 @router.post("/join", response_model=JoinRoomResponse)
-async def join_wine_room(
-    request: JoinRoomRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
+async def join_wine_room(request: Request, body: JoinRoomRequest):
     """
     Join or create a wine room for video chat.
     
@@ -56,10 +60,12 @@ async def join_wine_room(
     or joins an existing room.
     """
     try:
-        room_info = livekit_service.join_room(
-            wine_id=request.wine_id,
-            user_id=current_user.id
-        )
+        # Service calls do blocking DB/LiveKit I/O; run them off the event loop
+        room_info = await anyio.to_thread.run_sync(partial(
+            livekit_service.join_room,
+            wine_id=body.wine_id,
+            user_id=request.state.user.id
+        ))
         
         return JoinRoomResponse(**room_info)
         
@@ -74,11 +80,8 @@ async def join_wine_room(
             detail=f"Failed to join room: {str(e)}"
         )
 
-@router.post("/join/guest", response_model=JoinRoomResponse)
-async def join_room_as_guest(
-    request: GuestJoinRoomRequest,
-    db: Session = Depends(get_db)
-):
+@guest_router.post("/join/guest", response_model=JoinRoomResponse)
+async def join_room_as_guest(request: GuestJoinRoomRequest):
     """
     Join a wine room as a guest (no authentication required).
     
@@ -109,18 +112,16 @@ async def join_room_as_guest(
         )
 
 @router.post("/leave")
-async def leave_room(
-    request: LeaveRoomRequest,
-    current_user: User = Depends(get_current_user)
-):
+async def leave_room(request: Request, body: LeaveRoomRequest):
     """
     Leave a room and update participant count.
     """
     try:
-        success = livekit_service.leave_room(
-            user_id=current_user.id,
-            room_name=request.room_name
-        )
+        success = await anyio.to_thread.run_sync(partial(
+            livekit_service.leave_room,
+            user_id=request.state.user.id,
+            room_name=body.room_name
+        ))
         
         if success:
             return {"message": "Successfully left room"}
@@ -137,15 +138,12 @@ async def leave_room(
         )
 
 @router.get("/wine/{wine_id}")
-async def get_wine_rooms(
-    wine_id: str,
-    current_user: User = Depends(get_current_user)
-):
+async def get_wine_rooms(wine_id: str):
     """
     Get all active rooms for a specific wine.
     """
     try:
-        rooms = livekit_service.get_active_rooms_for_wine(wine_id)
+        rooms = await anyio.to_thread.run_sync(livekit_service.get_active_rooms_for_wine, wine_id)
         return {"rooms": rooms}
         
     except Exception as e:
@@ -155,15 +153,12 @@ async def get_wine_rooms(
         )
 
 @router.get("/{room_name}", response_model=RoomInfoResponse)
-async def get_room_info(
-    room_name: str,
-    current_user: User = Depends(get_current_user)
-):
+async def get_room_info(room_name: str):
     """
     Get detailed information about a specific room.
     """
     try:
-        room_info = livekit_service.get_room_info(room_name)
+        room_info = await anyio.to_thread.run_sync(livekit_service.get_room_info, room_name)
         
         if not room_info:
             raise HTTPException(
@@ -182,9 +177,7 @@ async def get_room_info(
         )
 
 @router.get("/")
-async def list_user_rooms(
-    current_user: User = Depends(get_current_user)
-):
+async def list_user_rooms():
     """
     List all rooms the current user has access to.
     This is a placeholder - in a real implementation,
@@ -202,16 +195,13 @@ async def list_user_rooms(
         )
 
 @router.delete("/cleanup")
-async def cleanup_inactive_rooms(
-    hours: int = 24,
-    current_user: User = Depends(get_current_user)
-):
+async def cleanup_inactive_rooms(hours: int = 24):
     """
     Clean up inactive rooms (admin function).
     """
     try:
         # In a real app, you'd check if user has admin privileges
-        cleaned_count = livekit_service.cleanup_inactive_rooms(hours)
+        cleaned_count = await anyio.to_thread.run_sync(livekit_service.cleanup_inactive_rooms, hours)
         
         return {
             "message": f"Cleaned up {cleaned_count} inactive rooms",
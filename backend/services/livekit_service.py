@@ -1,22 +1,46 @@
 """
 LiveKit room management service for wine chat rooms.
 """
+import base64
+import hashlib
+import hmac
+import threading
 import time
 import uuid
-from typing import Dict, List, Optional, Tuple
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
-from livekit import api
+import orjson
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, case, delete, func, select, update
 
 from config.settings import get_config
-from models.database import get_db
+from models.database import UPSERT_INSERTS, db_session
 from models.wine import RoomSession, Wine
 from models.user import User
+from utils.redis_client import get_redis
+
+# LiveKit access tokens are HS256 JWTs; the header never changes
+_LK_HEADER_B64 = base64.urlsafe_b64encode(b'{"alg":"HS256","typ":"JWT"}').rstrip(b'=')
+
+def _b64(data: bytes) -> bytes:
+    """Unpadded URL-safe base64, as used in JWT segments."""
+    return base64.urlsafe_b64encode(data).rstrip(b'=')
 
 class LiveKitRoomService:
     """Service for managing LiveKit rooms and tokens."""
     
+    # Participant counts returned to readers are cached briefly; joins and
+    # leaves update the row atomically in SQL and never read this cache
+    ROOM_COUNT_TTL = 2
+    ROOM_COUNT_CACHE_SIZE = 10_000
+    
+    # Registered users' access tokens (valid 24h) are reused for up to an hour,
+    # less a margin so a handed-out token always has plenty of life left
+    TOKEN_CACHE_TTL = 3600
+    TOKEN_REFRESH_MARGIN = 300
+    TOKEN_CACHE_SIZE = 50_000
+    
     def __init__(self):
         self.config = get_config()
         self.api_key = self.config.LIVEKIT_API_KEY
@@ -25,38 +49,120 @@ class LiveKitRoomService:
         
         if not self.api_key or not self.api_secret:
             raise ValueError("LiveKit API key and secret must be configured")
+        
+        # HMAC key for access tokens, encoded once
+        self._secret_bytes = self.api_secret.encode()
+        
+        # In-memory participant counts when Redis is not configured: room -> (count, expiry)
+        self._counts: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        self._counts_lock = threading.Lock()
+        
+        # Signed access tokens keyed by (user_id, room_name, user_name) -> (token, issued_at)
+        self._tokens: "OrderedDict[Tuple[str, str, str], Tuple[str, float]]" = OrderedDict()
+        self._tokens_lock = threading.Lock()
+    
+    @staticmethod
+    def _count_key(room_name: str) -> str:
+        return f"room:{room_name}:count"
+    
+    def _get_cached_count(self, room_name: str) -> Optional[int]:
+        """Cached participant count for a room, or None on a miss."""
+        client = get_redis()
+        if client is not None:
+            value = client.get(self._count_key(room_name))
+            return int(value) if value is not None else None
+        
+        with self._counts_lock:
+            entry = self._counts.get(room_name)
+        if entry is not None and entry[1] > time.monotonic():
+            return entry[0]
+        return None
+    
+    def _forget_counts(self, room_names: Optional[List[str]]):
+        """Drop cached counts for the given rooms, or every locally cached count if None."""
+        client = get_redis()
+        if client is not None:
+            # Without names, Redis entries simply expire within ROOM_COUNT_TTL
+            if room_names:
+                client.delete(*(self._count_key(name) for name in room_names))
+            return
+        
+        with self._counts_lock:
+            if room_names is None:
+                self._counts.clear()
+            else:
+                for name in room_names:
+                    self._counts.pop(name, None)
+    
+    def _cache_count(self, room_name: str, count: int):
+        """Remember a room's participant count for ROOM_COUNT_TTL seconds."""
+        client = get_redis()
+        if client is not None:
+            client.set(self._count_key(room_name), count, ex=self.ROOM_COUNT_TTL)
+            return
+        
+        with self._counts_lock:
+            self._counts[room_name] = (count, time.monotonic() + self.ROOM_COUNT_TTL)
+            self._counts.move_to_end(room_name)
+            while len(self._counts) > self.ROOM_COUNT_CACHE_SIZE:
+                self._counts.popitem(last=False)
     
     def generate_room_name(self, wine_id: str) -> str:
         """Generate a unique room name for a wine."""
         return f"wine-{wine_id}"
     
+    def _sign_token(self, claims: Dict[str, Any]) -> str:
+        """Sign LiveKit JWT claims with the API secret (HS256)."""
+        body = _LK_HEADER_B64 + b'.' + _b64(orjson.dumps(claims))
+        signature = hmac.new(self._secret_bytes, body, hashlib.sha256).digest()
+        return (body + b'.' + _b64(signature)).decode('ascii')
+    
     def generate_access_token(self, user_id: str, room_name: str, user_name: str = "", is_guest: bool = False) -> str:
         """Generate LiveKit access token for a user to join a room."""
+        # Guests get a fresh identity on every call, so only registered users' tokens are reused
+        key = None if is_guest else (user_id, room_name, user_name)
+        if key is not None:
+            with self._tokens_lock:
+                entry = self._tokens.get(key)
+            if entry is not None and time.monotonic() - entry[1] < self.TOKEN_CACHE_TTL - self.TOKEN_REFRESH_MARGIN:
+                return entry[0]
+        
         try:
-            token = api.AccessToken(self.api_key, self.api_secret)
-            
             # For guest users, generate a unique ID
             if is_guest:
                 user_id = f"guest-{uuid.uuid4().hex[:8]}"
                 user_name = user_name or f"Guest {uuid.uuid4().hex[:4]}"
             
-            token.with_identity(user_id)
-            token.with_name(user_name)
-            token.with_grants(api.VideoGrants(
-                room_join=True,
-                room=room_name,
-                can_publish=True,
-                can_subscribe=True,
-                can_publish_data=True
-            ))
-            
             # Token expires in 24 hours for registered users, 2 hours for guests
             ttl_hours = 2 if is_guest else 24
-            token.with_ttl(timedelta(hours=ttl_hours))
-            
-            return token.to_jwt()
+            now = int(time.time())
+            
+            # Same claims as livekit.api.AccessToken.to_jwt()
+            token = self._sign_token({
+                'name': user_name,
+                'video': {
+                    'roomJoin': True,
+                    'room': room_name,
+                    'canPublish': True,
+                    'canSubscribe': True,
+                    'canPublishData': True
+                },
+                'sub': user_id,
+                'iss': self.api_key,
+                'nbf': now,
+                'exp': now + ttl_hours * 3600
+            })
         except Exception as e:
             raise Exception(f"Failed to generate access token: {str(e)}")
+        
+        if key is not None:
+            with self._tokens_lock:
+                self._tokens[key] = (token, time.monotonic())
+                self._tokens.move_to_end(key)
+                while len(self._tokens) > self.TOKEN_CACHE_SIZE:
+                    self._tokens.popitem(last=False)
+        
+        return token
     
     def create_or_get_room(self, wine_id: str, user_id: str) -> Tuple[str, str]:
         """
@@ -65,55 +171,61 @@ class LiveKitRoomService:
         Returns:
             Tuple of (room_name, access_token)
         """
-        db = next(get_db())
-        try:
-            # Get wine information
-            wine = db.query(Wine).filter(Wine.id == wine_id).first()
-            if not wine:
+        room_name = self.generate_room_name(wine_id)
+        
+        with db_session() as db:
+            # Wine and user checked in one round trip (two primary-key probes)
+            found_wine_id, user_name = db.execute(select(
+                select(Wine.id).where(Wine.id == wine_id).scalar_subquery(),
+                select(User.name).where(User.id == user_id).scalar_subquery()
+            )).one()
+            
+            if found_wine_id is None:
                 raise ValueError(f"Wine with ID {wine_id} not found")
-            
-            # Get user information
-            user = db.query(User).filter(User.id == user_id).first()
-            if not user:
+            if user_name is None:
                 raise ValueError(f"User with ID {user_id} not found")
             
-            room_name = self.generate_room_name(wine_id)
-            
-            # Check if room session already exists
-            room_session = db.query(RoomSession).filter(
-                RoomSession.wine_id == wine_id,
-                RoomSession.room_name == room_name
-            ).first()
-            
-            if not room_session:
-                # Create new room session
-                room_session = RoomSession(
-                    id=str(uuid.uuid4()),
-                    wine_id=wine_id,
-                    room_name=room_name,
-                    active_participants=0
+            now = datetime.utcnow()
+            insert = UPSERT_INSERTS.get(db.get_bind().dialect.name)
+            if insert is not None:
+                # Ensure the room exists and touch it in a single statement
+                db.execute(
+                    insert(RoomSession).values(
+                        wine_id=wine_id,
+                        room_name=room_name,
+                        active_participants=0,
+                        last_activity=now
+                    ).on_conflict_do_update(
+                        index_elements=['wine_id', 'room_name'],
+                        set_={'last_activity': now}
+                    )
                 )
-                db.add(room_session)
-                db.commit()
+            else:
+                room_session = db.query(RoomSession).filter(
+                    RoomSession.wine_id == wine_id,
+                    RoomSession.room_name == room_name
+                ).first()
+                
+                if not room_session:
+                    room_session = RoomSession(
+                        wine_id=wine_id,
+                        room_name=room_name,
+                        active_participants=0
+                    )
+                    db.add(room_session)
+                
+                room_session.last_activity = now
             
-            # Update last activity
-            room_session.last_activity = datetime.utcnow()
             db.commit()
-            
-            # Generate access token
-            access_token = self.generate_access_token(
-                user_id=user_id,
-                room_name=room_name,
-                user_name=user.name
-            )
-            
-            return room_name, access_token
-            
-        except Exception as e:
-            db.rollback()
-            raise e
-        finally:
-            db.close()
+        
+        # Generate access token
+        access_token = self.generate_access_token(
+            user_id=user_id,
+            room_name=room_name,
+            user_name=user_name
+        )
+        
+        return room_name, access_token
     
     def join_room(self, wine_id: str, user_id: str) -> Dict:
         """
@@ -125,18 +237,17 @@ class LiveKitRoomService:
         try:
             room_name, access_token = self.create_or_get_room(wine_id, user_id)
             
-            # Get room participants count
-            participants_count = self.get_room_participants_count(room_name)
-            
-            # Update participant count in database
-            self._update_participant_count(wine_id, room_name, participants_count + 1)
+            # Increment participant count in database
+            participants_count = self._adjust_participant_count(wine_id, room_name, 1)
+            if participants_count is None:
+                participants_count = self.get_room_participants_count(room_name)
             
             return {
                 'room_name': room_name,
                 'access_token': access_token,
                 'livekit_url': self.livekit_url,
                 'wine_id': wine_id,
-                'participants_count': participants_count + 1
+                'participants_count': participants_count
             }
             
         except Exception as e:
@@ -150,12 +261,9 @@ class LiveKitRoomService:
             True if successful
         """
         try:
-            # Get current participants count
-            participants_count = self.get_room_participants_count(room_name)
-            
-            # Update participant count in database
+            # Decrement participant count in database
             wine_id = room_name.replace('wine-', '')
-            self._update_participant_count(wine_id, room_name, max(0, participants_count - 1))
+            self._adjust_participant_count(wine_id, room_name, -1)
             
             return True
             
@@ -170,21 +278,23 @@ class LiveKitRoomService:
         Note: In a real implementation, this would query the LiveKit server.
         For now, we'll use the database count as a fallback.
         """
-        db = next(get_db())
-        try:
+        count = self._get_cached_count(room_name)
+        if count is not None:
+            return count
+        
+        with db_session() as db:
             room_session = db.query(RoomSession).filter(
                 RoomSession.room_name == room_name
             ).first()
             
-            return room_session.active_participants if room_session else 0
-            
-        finally:
-            db.close()
+            count = room_session.active_participants if room_session else 0
+        
+        self._cache_count(room_name, count)
+        return count
     
     def get_active_rooms_for_wine(self, wine_id: str) -> List[Dict]:
         """Get all active rooms for a specific wine."""
-        db = next(get_db())
-        try:
+        with db_session() as db:
             # Get rooms that have been active in the last hour
             cutoff_time = datetime.utcnow() - timedelta(hours=1)
             
@@ -205,76 +315,84 @@ class LiveKitRoomService:
                 }
                 for room in rooms
             ]
-            
-        finally:
-            db.close()
     
     def get_room_info(self, room_name: str) -> Optional[Dict]:
         """Get detailed information about a room."""
-        db = next(get_db())
-        try:
-            room_session = db.query(RoomSession).filter(
-                RoomSession.room_name == room_name
+        with db_session() as db:
+            # Room and wine name in one query
+            row = db.execute(
+                select(RoomSession, Wine.name)
+                .outerjoin(Wine, Wine.id == RoomSession.wine_id)
+                .where(RoomSession.room_name == room_name)
+                .limit(1)
             ).first()
             
-            if not room_session:
+            if not row:
                 return None
             
-            wine = db.query(Wine).filter(Wine.id == room_session.wine_id).first()
+            room_session, wine_name = row
             
             return {
                 'room_name': room_name,
                 'wine_id': room_session.wine_id,
-                'wine_name': wine.name if wine else 'Unknown Wine',
+                'wine_name': wine_name or 'Unknown Wine',
                 'participants_count': room_session.active_participants,
                 'created_at': room_session.created_at.isoformat(),
                 'last_activity': room_session.last_activity.isoformat()
             }
-            
-        finally:
-            db.close()
     
-    def _update_participant_count(self, wine_id: str, room_name: str, count: int):
-        """Update participant count in database."""
-        db = next(get_db())
+    def _adjust_participant_count(self, wine_id: str, room_name: str, delta: int) -> Optional[int]:
+        """
+        Atomically add delta to a room's participant count (floored at 0).
+        
+        Returns:
+            The new count, or None if the room does not exist or the update failed
+        """
+        current = func.coalesce(RoomSession.active_participants, 0)
+        new_count = case((current + delta < 0, 0), else_=current + delta)
+        where = (RoomSession.wine_id == wine_id, RoomSession.room_name == room_name)
+        
         try:
-            room_session = db.query(RoomSession).filter(
-                RoomSession.wine_id == wine_id,
-                RoomSession.room_name == room_name
-            ).first()
-            
-            if room_session:
-                room_session.active_participants = count
-                room_session.last_activity = datetime.utcnow()
+            with db_session() as db:
+                # Computed by the database, so concurrent joins/leaves on any
+                # worker never overwrite each other
+                stmt = update(RoomSession).where(*where).values(
+                    active_participants=new_count,
+                    last_activity=datetime.utcnow()
+                )
+                if db.get_bind().dialect.update_returning:
+                    count = db.scalar(stmt.returning(RoomSession.active_participants))
+                else:
+                    db.execute(stmt)
+                    count = db.scalar(select(RoomSession.active_participants).where(*where))
                 db.commit()
                 
         except Exception as e:
-            db.rollback()
             print(f"Error updating participant count: {str(e)}")
-        finally:
-            db.close()
+            return None
+        
+        if count is not None:
+            self._cache_count(room_name, count)
+        return count
     
     def cleanup_inactive_rooms(self, hours: int = 24):
         """Clean up rooms that have been inactive for specified hours."""
-        db = next(get_db())
-        try:
+        with db_session() as db:
             cutoff_time = datetime.utcnow() - timedelta(hours=hours)
             
-            inactive_rooms = db.query(RoomSession).filter(
-                RoomSession.last_activity < cutoff_time
-            ).all()
-            
-            for room in inactive_rooms:
-                db.delete(room)
+            # One indexed range delete; no rows are loaded into the session
+            stmt = delete(RoomSession).where(RoomSession.last_activity < cutoff_time)
+            if db.get_bind().dialect.delete_returning:
+                room_names = db.scalars(stmt.returning(RoomSession.room_name)).all()
+                deleted = len(room_names)
+            else:
+                room_names = None
+                deleted = db.execute(stmt).rowcount
             
             db.commit()
-            return len(inactive_rooms)
-            
-        except Exception as e:
-            db.rollback()
-            raise e
-        finally:
-            db.close()
+        
+        self._forget_counts(room_names)
+        return deleted
 
 # Global service instance
 livekit_service = LiveKitRoomService()
\ No newline at end of file
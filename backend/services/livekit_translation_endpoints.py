@@ -1,6 +1,7 @@
 """
 FastAPI endpoints for LiveKit-based translation service.
 """
+import anyio
 from fastapi import APIRouter, HTTPException, Depends, WebSocket, WebSocketDisconnect
 from typing import Dict, List, Optional
 from pydantic import BaseModel
@@ -51,7 +52,7 @@ async def start_translation(
     """Start translation session for a user in a room."""
     
     try:
-        user = get_current_user(token, db)
+        user = await anyio.to_thread.run_sync(get_current_user, token, db)
         
         await livekit_translation_service.start_translation_session(
             room_name=request.room_name,
@@ -79,7 +80,7 @@ async def stop_translation(
     """Stop translation session for a user."""
     
     try:
-        user = get_current_user(token, db)
+        user = await anyio.to_thread.run_sync(get_current_user, token, db)
         
         await livekit_translation_service.stop_translation_session(
             room_name=room_name,
@@ -104,7 +105,7 @@ async def update_settings(
     """Update user's translation settings."""
     
     try:
-        user = get_current_user(token, db)
+        user = await anyio.to_thread.run_sync(get_current_user, token, db)
         
         settings_data = request.dict(exclude_unset=True)
         
@@ -135,7 +136,7 @@ async def get_room_participants(
     """Get participants in a room with their language settings."""
     
     try:
-        user = get_current_user(token, db)
+        user = await anyio.to_thread.run_sync(get_current_user, token, db)
         
         participants = livekit_translation_service.get_room_participants(room_name)
         
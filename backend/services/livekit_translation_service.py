@@ -4,6 +4,8 @@ Uses LiveKit's built-in AI capabilities for real-time translation.
 """
 import asyncio
 import logging
+import anyio
+from types import MappingProxyType
 from typing import Dict, List, Optional, Any
 from livekit import rtc
 from livekit.agents import (
@@ -25,10 +27,49 @@ from config.settings import get_config
 logger = logging.getLogger(__name__)
 config = get_config()
 
+# Language lookups, read-only and shared by every agent
+_DEEPGRAM_LANGS = MappingProxyType({
+    "ja": "ja",
+    "en": "en-US",
+    "ko": "ko",
+    "zh": "zh-CN",
+    "es": "es",
+    "fr": "fr",
+    "de": "de",
+})
+
+_OPENAI_VOICES = MappingProxyType({
+    "ja": "nova",
+    "en": "alloy",
+    "ko": "nova",
+    "zh": "nova",
+    "es": "nova",
+    "fr": "nova",
+    "de": "nova",
+})
+
+_LANG_NAMES = MappingProxyType({
+    "ja": "Japanese",
+    "en": "English",
+    "ko": "Korean",
+    "zh": "Chinese",
+    "es": "Spanish",
+    "fr": "French",
+    "de": "German",
+})
+
 
 class LiveKitTranslationAgent:
     """LiveKit Agent for real-time speech translation."""
     
+    # Providers shared by every agent in the process: the Silero VAD weights
+    # load once, and STT/TTS clients are keyed by what configures them
+    _vad = None
+    _llm = None
+    _stt_cache: Dict[str, deepgram.STT] = {}
+    _tts_cache: Dict[str, openai.TTS] = {}
+    _vad_lock = asyncio.Lock()
+    
     def __init__(self):
         self.active_agents: Dict[str, VoicePipelineAgent] = {}
         self.room_contexts: Dict[str, JobContext] = {}
@@ -42,33 +83,41 @@ class LiveKitTranslationAgent:
     ) -> VoicePipelineAgent:
         """Create a voice pipeline agent for translation."""
         
-        # Configure STT (Speech-to-Text) using Deepgram
-        stt_provider = deepgram.STT(
-            model="nova-2",
-            language=self._get_deepgram_language_code(source_language),
-            detect_language=False,
-            interim_results=True,
-            smart_format=True,
-            punctuate=True,
-        )
+        cls = LiveKitTranslationAgent
         
-        # Configure TTS (Text-to-Speech) using OpenAI
-        tts_provider = openai.TTS(
-            model="tts-1",
-            voice=self._get_openai_voice(source_language),
-        )
+        # Configure STT (Speech-to-Text) using Deepgram, one client per source language
+        stt_provider = cls._stt_cache.get(source_language)
+        if stt_provider is None:
+            stt_provider = cls._stt_cache[source_language] = deepgram.STT(
+                model="nova-2",
+                language=self._get_deepgram_language_code(source_language),
+                detect_language=False,
+                interim_results=True,
+                smart_format=True,
+                punctuate=True,
+            )
+        
+        # Configure TTS (Text-to-Speech) using OpenAI, one client per voice
+        voice = self._get_openai_voice(source_language)
+        tts_provider = cls._tts_cache.get(voice)
+        if tts_provider is None:
+            tts_provider = cls._tts_cache[voice] = openai.TTS(
+                model="tts-1",
+                voice=voice,
+            )
         
         # Configure LLM for translation
-        llm_provider = openai.LLM(model="gpt-4-turbo-preview")
+        if cls._llm is None:
+            cls._llm = openai.LLM(model="gpt-4-turbo-preview")
         
         # Create initial context for translation
         initial_ctx = self._create_translation_context(source_language, target_languages)
         
         # Create voice pipeline agent
         agent = VoicePipelineAgent(
-            vad=silero.VAD.load(),
+            vad=await self._get_vad(),
             stt=stt_provider,
-            llm=llm_provider,
+            llm=cls._llm,
             tts=tts_provider,
             chat_ctx=initial_ctx,
         )
@@ -78,6 +127,15 @@ class LiveKitTranslationAgent:
         
         return agent
     
+    @classmethod
+    async def _get_vad(cls):
+        """Voice activity detection model, loaded once in a worker thread."""
+        if cls._vad is None:
+            async with cls._vad_lock:
+                if cls._vad is None:
+                    cls._vad = await asyncio.to_thread(silero.VAD.load)
+        return cls._vad
+    
     def _create_translation_context(
         self,
         source_language: str,
@@ -117,7 +175,11 @@ Format your response as:
     ):
         """Start translation for all participants in a room."""
         
-        await ctx.connect(auto_subscribe=AutoSubscribe.AUDIO_ONLY)
+        # Load the VAD model off the event loop while connecting to the room
+        await asyncio.gather(
+            ctx.connect(auto_subscribe=AutoSubscribe.AUDIO_ONLY),
+            self._get_vad()
+        )
         
         # Create agents for each participant based on their language preferences
         for participant_info in participants:
@@ -172,44 +234,20 @@ Format your response as:
             del self.active_agents[user_id]
             logger.info(f"Stopped translation for user {user_id}")
     
-    def _get_deepgram_language_code(self, language: str) -> str:
+    @staticmethod
+    def _get_deepgram_language_code(language: str) -> str:
         """Convert language code to Deepgram format."""
-        language_map = {
-            "ja": "ja",
-            "en": "en-US",
-            "ko": "ko",
-            "zh": "zh-CN",
-            "es": "es",
-            "fr": "fr",
-            "de": "de",
-        }
-        return language_map.get(language, "en-US")
+        return _DEEPGRAM_LANGS.get(language, "en-US")
     
-    def _get_openai_voice(self, language: str) -> str:
+    @staticmethod
+    def _get_openai_voice(language: str) -> str:
         """Get appropriate OpenAI TTS voice for language."""
-        voice_map = {
-            "ja": "nova",
-            "en": "alloy",
-            "ko": "nova",
-            "zh": "nova",
-            "es": "nova",
-            "fr": "nova",
-            "de": "nova",
-        }
-        return voice_map.get(language, "alloy")
+        return _OPENAI_VOICES.get(language, "alloy")
     
-    def _get_language_name(self, code: str) -> str:
+    @staticmethod
+    def _get_language_name(code: str) -> str:
         """Get full language name from code."""
-        names = {
-            "ja": "Japanese",
-            "en": "English",
-            "ko": "Korean",
-            "zh": "Chinese",
-            "es": "Spanish",
-            "fr": "French",
-            "de": "German",
-        }
-        return names.get(code, "English")
+        return _LANG_NAMES.get(code, "English")
 
 
 class LiveKitTranslationService:
@@ -219,6 +257,39 @@ class LiveKitTranslationService:
         self.agent = LiveKitTranslationAgent()
         self.active_sessions: Dict[str, Dict] = {}
     
+    @staticmethod
+    def _load_settings(user_id: str, db: Session) -> TranslationSettings:
+        """Get the user's translation settings, creating the defaults if missing."""
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user:
+            raise ValueError(f"User {user_id} not found")
+        
+        settings = user.translation_settings
+        if not settings:
+            settings = TranslationSettings(user_id=user_id)
+            db.add(settings)
+            db.commit()
+        
+        return settings
+    
+    @staticmethod
+    def _save_settings(user_id: str, settings_data: Dict, db: Session):
+        """Apply settings_data to the user's translation settings and commit."""
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user:
+            raise ValueError(f"User {user_id} not found")
+        
+        settings = user.translation_settings
+        if not settings:
+            settings = TranslationSettings(user_id=user_id)
+            db.add(settings)
+        
+        for key, value in settings_data.items():
+            if hasattr(settings, key):
+                setattr(settings, key, value)
+        
+        db.commit()
+    
     async def start_translation_session(
         self,
         room_name: str,
@@ -230,22 +301,8 @@ class LiveKitTranslationService:
         """Start a translation session for a user."""
         
         try:
-            # Get user settings
-            user = db.query(User).filter(User.id == user_id).first()
-            if not user:
-                raise ValueError(f"User {user_id} not found")
-            
-            settings = user.translation_settings
-            if not settings:
-                settings = TranslationSettings(user_id=user_id)
-                db.add(settings)
-                db.commit()
-            
-            # Store session info
-            if room_name not in self.active_sessions:
-                self.active_sessions[room_name] = {
-                    "participants": []
-                }
+            # Get user settings (blocking DB work, kept off the event loop)
+            settings = await anyio.to_thread.run_sync(self._load_settings, user_id, db)
             
             participant_info = {
                 "user_id": user_id,
@@ -254,7 +311,8 @@ class LiveKitTranslationService:
                 "settings": settings,
             }
             
-            self.active_sessions[room_name]["participants"].append(participant_info)
+            # Store session info; participants are keyed by user ID
+            self.active_sessions.setdefault(room_name, {"participants": {}})["participants"][user_id] = participant_info
             
             logger.info(f"Started translation session for user {user_id} in room {room_name}")
             
@@ -270,12 +328,10 @@ class LiveKitTranslationService:
         try:
             if room_name in self.active_sessions:
                 participants = self.active_sessions[room_name]["participants"]
-                self.active_sessions[room_name]["participants"] = [
-                    p for p in participants if p["user_id"] != user_id
-                ]
+                participants.pop(user_id, None)
                 
                 # Remove room if no participants left
-                if not self.active_sessions[room_name]["participants"]:
+                if not participants:
                     await self.agent.stop_room_translation(room_name)
                     del self.active_sessions[room_name]
                 else:
@@ -295,20 +351,7 @@ class LiveKitTranslationService:
         """Update user's translation settings."""
         
         try:
-            user = db.query(User).filter(User.id == user_id).first()
-            if not user:
-                raise ValueError(f"User {user_id} not found")
-            
-            settings = user.translation_settings
-            if not settings:
-                settings = TranslationSettings(user_id=user_id)
-                db.add(settings)
-            
-            for key, value in settings_data.items():
-                if hasattr(settings, key):
-                    setattr(settings, key, value)
-            
-            db.commit()
+            await anyio.to_thread.run_sync(self._save_settings, user_id, settings_data, db)
             
             return True
             
@@ -320,7 +363,7 @@ class LiveKitTranslationService:
         """Get participants in a room."""
         
         if room_name in self.active_sessions:
-            return self.active_sessions[room_name]["participants"]
+            return list(self.active_sessions[room_name]["participants"].values())
         return []
 
 
@@ -3,7 +3,6 @@ Multilingual content service for handling translations and localized content.
 """
 from typing import Dict, Any, Optional, List
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
 
 from models.wine import Wine, Translation, VoiceProfile
 from models.database import get_db
@@ -114,12 +113,7 @@ class MultilingualService:
         """
         db = next(get_db())
         try:
-            translation = db.query(Translation).filter(
-                and_(
-                    Translation.key == key,
-                    Translation.language == language
-                )
-            ).first()
+            translation = db.get(Translation, (key, language))
             
             return translation.value if translation else None
         finally:
@@ -139,12 +133,7 @@ class MultilingualService:
         """
         db = next(get_db())
         try:
-            translation = db.query(Translation).filter(
-                and_(
-                    Translation.key == key,
-                    Translation.language == language
-                )
-            ).first()
+            translation = db.get(Translation, (key, language))
             
             if translation:
                 translation.value = value
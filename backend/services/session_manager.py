@@ -1,27 +1,146 @@
 """
 Session management utilities for JWT tokens and user sessions.
 """
+import hashlib
 import jwt
+import logging
+import threading
 import time
-from typing import Dict, Any, Optional, Set
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Dict, Any, Optional
 from datetime import datetime, timedelta
+from fastapi import Depends, HTTPException, Request
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy.orm import Session
 from config.settings import Config
+from models.database import get_db
+from models.user import User
+from utils.bloom import BloomFilter
+from utils.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
 
 
 class SessionManager:
     """Manage user sessions and JWT tokens."""
     
+    # Upper bound on remembered verified access tokens
+    VERIFIED_CACHE_SIZE = 10_000
+    
+    # Longest lifetime of any token we issue (refresh tokens); caps revocation entries
+    MAX_TOKEN_LIFETIME = 30 * 24 * 3600
+    
+    # Redis revocation list (sorted set: token digest hex -> exp) and the
+    # channel blacklist_token announces new entries on
+    REVOKED_KEY = 'bl:revoked'
+    REVOKED_CHANNEL = 'bl:events'
+    
+    # Seconds between background rebuilds of the local filter, dropping expired entries
+    BLOOM_REBUILD = 3600
+    
     def __init__(self):
         self.config = Config()
-        # In-memory token blacklist (use Redis in production)
-        self._blacklisted_tokens: Set[str] = set()
+        self._algos = ('HS256',)
+        # In-memory revocation list when Redis is not configured: token digest -> exp
+        self._revoked: Dict[bytes, float] = {}
+        # Verified access-token payloads keyed by token digest; shared, do not mutate
+        self._verified: "OrderedDict[bytes, Dict[str, Any]]" = OrderedDict()
+        self._verified_lock = threading.Lock()
+        # Local filter over the Redis revocation list, kept current by a background
+        # listener; only a hit costs a round trip. None while the listener is not
+        # live, in which case every check asks Redis.
+        self._bloom: Optional[BloomFilter] = None
+        self._listener: Optional[threading.Thread] = None
+        self._listener_lock = threading.Lock()
+    
+    @cached_property
+    def signing_key(self) -> bytes:
+        """
+        HMAC key used for every encode/decode, prepared once.
+        
+        Tests can assign a different key to the attribute, or delete it
+        to have it rebuilt from the config.
+        """
+        return self.config.JWT_SECRET_KEY.encode()
+    
+    @staticmethod
+    def _token_digest(token: str) -> bytes:
+        """Compact token identifier for caches and the revocation list."""
+        return hashlib.blake2b(token.encode(), digest_size=16).digest()
+    
+    def _load_bloom(self, client) -> BloomFilter:
+        """Build a filter from the unexpired entries of the Redis revocation list."""
+        bloom = BloomFilter()
+        for member in client.zrangebyscore(self.REVOKED_KEY, time.time(), '+inf'):
+            bloom.add(bytes.fromhex(member.decode()))
+        return bloom
+    
+    def _listen_for_revocations(self, client) -> None:
+        """Keep the local filter in step with revocations made by any worker."""
+        while True:
+            pubsub = client.pubsub()
+            try:
+                # Subscribe before loading, so nothing revoked in between is missed
+                pubsub.subscribe(self.REVOKED_CHANNEL)
+                while pubsub.get_message(timeout=5.0) is None:
+                    pass
+                
+                self._bloom = self._load_bloom(client)
+                built = time.monotonic()
+                
+                while True:
+                    message = pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is not None and message['type'] == 'message':
+                        self._bloom.add(bytes.fromhex(message['data'].decode()))
+                    if time.monotonic() - built > self.BLOOM_REBUILD:
+                        # Announcements arriving meanwhile stay queued on the subscription
+                        self._bloom = self._load_bloom(client)
+                        built = time.monotonic()
+            except Exception:
+                logger.exception("Revocation listener failed; checking Redis directly until it recovers")
+                self._bloom = None
+            finally:
+                pubsub.close()
+            time.sleep(1.0)
+    
+    def _ensure_listener(self, client) -> None:
+        """Start the background revocation listener once per process."""
+        if self._listener is not None:
+            return
+        with self._listener_lock:
+            if self._listener is None:
+                self._listener = threading.Thread(
+                    target=self._listen_for_revocations,
+                    args=(client,),
+                    name='revocation-listener',
+                    daemon=True
+                )
+                self._listener.start()
+    
+    def _is_revoked(self, key: bytes) -> bool:
+        """Check a token digest against the revocation list."""
+        client = get_redis()
+        if client is None:
+            return key in self._revoked
+        
+        self._ensure_listener(client)
+        bloom = self._bloom
+        if bloom is not None and key not in bloom:
+            return False
+        
+        exp = client.zscore(self.REVOKED_KEY, key.hex())
+        return exp is not None and exp > time.time()
     
     def create_session_token(self, user_data: Dict[str, Any]) -> str:
         """
         Create JWT session token for user.
         
         Args:
-            user_data: User information to encode in token
+            user_data: User information to encode in token; an 'auth_time'
+                entry carries over when the user was last checked against
+                the database (defaults to now)
             
         Returns:
             JWT token string
@@ -31,12 +150,34 @@ class SessionManager:
             'email': user_data['email'],
             'name': user_data['name'],
             'main_language': user_data.get('main_language', 'ja'),
+            'auth_time': user_data.get('auth_time') or int(time.time()),
             'iat': datetime.utcnow(),
             'exp': datetime.utcnow() + timedelta(days=7),  # 7 days expiration
             'type': 'access_token'
         }
         
-        return jwt.encode(payload, self.config.JWT_SECRET_KEY, algorithm='HS256')
+        return jwt.encode(payload, self.signing_key, algorithm=self._algos[0])
+    
+    def resign(self, payload: Dict[str, Any]) -> str:
+        """
+        Issue a fresh access token for the user described by a validated payload.
+        
+        The payload's auth_time is kept, so re-signing never extends the
+        time since the user was last checked against the database.
+        
+        Args:
+            payload: Decoded access-token payload
+            
+        Returns:
+            JWT token string
+        """
+        return self.create_session_token({
+            'id': payload['user_id'],
+            'email': payload['email'],
+            'name': payload['name'],
+            'main_language': payload.get('main_language', 'ja'),
+            'auth_time': payload['auth_time']
+        })
     
     def create_refresh_token(self, user_id: str) -> str:
         """
@@ -55,7 +196,7 @@ class SessionManager:
             'type': 'refresh_token'
         }
         
-        return jwt.encode(payload, self.config.JWT_SECRET_KEY, algorithm='HS256')
+        return jwt.encode(payload, self.signing_key, algorithm=self._algos[0])
     
     def validate_token(self, token: str) -> Optional[Dict[str, Any]]:
         """
@@ -67,16 +208,28 @@ class SessionManager:
         Returns:
             Token payload if valid, None otherwise
         """
-        if token in self._blacklisted_tokens:
+        key = self._token_digest(token)
+        if self._is_revoked(key):
             return None
         
+        # Signature already checked for this token; only expiry can change
+        with self._verified_lock:
+            payload = self._verified.get(key)
+        if payload is not None:
+            return payload if payload['exp'] > time.time() else None
+        
         try:
-            payload = jwt.decode(token, self.config.JWT_SECRET_KEY, algorithms=['HS256'])
+            payload = jwt.decode(token, self.signing_key, algorithms=self._algos)
             
             # Check token type
             if payload.get('type') != 'access_token':
                 return None
             
+            with self._verified_lock:
+                self._verified[key] = payload
+                while len(self._verified) > self.VERIFIED_CACHE_SIZE:
+                    self._verified.popitem(last=False)
+            
             return payload
             
         except jwt.ExpiredSignatureError:
@@ -94,11 +247,11 @@ class SessionManager:
         Returns:
             Token payload if valid, None otherwise
         """
-        if token in self._blacklisted_tokens:
+        if self._is_revoked(self._token_digest(token)):
             return None
         
         try:
-            payload = jwt.decode(token, self.config.JWT_SECRET_KEY, algorithms=['HS256'])
+            payload = jwt.decode(token, self.signing_key, algorithms=self._algos)
             
             # Check token type
             if payload.get('type') != 'refresh_token':
@@ -140,9 +293,49 @@ class SessionManager:
             token: Token to blacklist
             
         Returns:
-            True if successful
+            True if successful, False if the token was not signed by us
         """
-        self._blacklisted_tokens.add(token)
+        # Tokens we did not sign can never validate, so there is nothing to revoke
+        try:
+            payload = jwt.decode(
+                token,
+                self.signing_key,
+                algorithms=self._algos,
+                options={"verify_exp": False}
+            )
+        except jwt.InvalidTokenError:
+            return False
+        
+        key = self._token_digest(token)
+        with self._verified_lock:
+            self._verified.pop(key, None)
+        
+        # Only needed until the token would expire anyway (never past the longest lifetime)
+        now = int(time.time())
+        try:
+            exp = min(int(payload['exp']), now + self.MAX_TOKEN_LIFETIME)
+        except (KeyError, TypeError, ValueError):
+            exp = now + self.MAX_TOKEN_LIFETIME
+        
+        if exp <= now:
+            return True
+        
+        client = get_redis()
+        if client is not None:
+            member = key.hex()
+            pipe = client.pipeline()
+            pipe.zadd(self.REVOKED_KEY, {member: exp})
+            pipe.zremrangebyscore(self.REVOKED_KEY, '-inf', now)
+            pipe.publish(self.REVOKED_CHANNEL, member)
+            pipe.execute()
+            
+            bloom = self._bloom
+            if bloom is not None:
+                bloom.add(key)
+        else:
+            self.cleanup_expired_tokens()
+            self._revoked[key] = exp
+        
         return True
     
     def is_token_blacklisted(self, token: str) -> bool:
@@ -155,16 +348,17 @@ class SessionManager:
         Returns:
             True if token is blacklisted
         """
-        return token in self._blacklisted_tokens
+        return self._is_revoked(self._token_digest(token))
     
     def cleanup_expired_tokens(self):
         """
         Clean up expired tokens from blacklist.
         This should be called periodically to prevent memory leaks.
         """
-        # For production, implement proper cleanup with Redis expiration
-        # For now, we'll keep all tokens in memory
-        pass
+        # blacklist_token prunes the Redis list; only the in-memory list needs pruning here
+        now = time.time()
+        for key in [k for k, exp in self._revoked.items() if exp <= now]:
+            del self._revoked[key]
     
     def get_token_info(self, token: str) -> Optional[Dict[str, Any]]:
         """
@@ -179,8 +373,8 @@ class SessionManager:
         try:
             payload = jwt.decode(
                 token, 
-                self.config.JWT_SECRET_KEY, 
-                algorithms=['HS256'],
+                self.signing_key, 
+                algorithms=self._algos,
                 options={"verify_exp": False}  # Don't verify expiration
             )
             return payload
@@ -206,7 +400,7 @@ class SessionManager:
             'type': 'oauth_state'
         }
         
-        return jwt.encode(payload, self.config.JWT_SECRET_KEY, algorithm='HS256')
+        return jwt.encode(payload, self.signing_key, algorithm=self._algos[0])
     
     def validate_state_token(self, token: str) -> Optional[Dict[str, Any]]:
         """
@@ -219,7 +413,7 @@ class SessionManager:
             State payload if valid
         """
         try:
-            payload = jwt.decode(token, self.config.JWT_SECRET_KEY, algorithms=['HS256'])
+            payload = jwt.decode(token, self.signing_key, algorithms=self._algos)
             
             # Check token type
             if payload.get('type') != 'oauth_state':
@@ -234,4 +428,63 @@ class SessionManager:
 
 
 # Global session manager instance
-session_manager = SessionManager()
\ No newline at end of file
+session_manager = SessionManager()
+
+
+@dataclass(frozen=True, slots=True)
+class UserPrincipal:
+    """Authenticated user as described by the access token (no DB row)."""
+    id: str
+    email: str
+    name: str
+    main_language: str
+
+
+# Security scheme
+security = HTTPBearer()
+
+
+def get_current_user_from_token(token: str, db: Optional[Session] = None) -> Optional[UserPrincipal]:
+    """Resolve a raw access token to its principal, or None if invalid."""
+    payload = session_manager.validate_token(token)
+    if not payload:
+        return None
+    
+    return UserPrincipal(
+        id=payload['user_id'],
+        email=payload['email'],
+        name=payload['name'],
+        main_language=payload.get('main_language', 'ja')
+    )
+
+
+def get_current_user(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> UserPrincipal:
+    """
+    Dependency returning the token's principal without touching the database.
+    
+    The principal is also stored on request.state.user, so routers that
+    authenticate via router-level dependencies can read it from there.
+    """
+    user = get_current_user_from_token(credentials.credentials)
+    
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    
+    request.state.user = user
+    return user
+
+
+def get_current_user_full(
+    principal: UserPrincipal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> User:
+    """Dependency loading the user row, bound to the request's DB session."""
+    user = db.get(User, principal.id)
+    
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    
+    return user
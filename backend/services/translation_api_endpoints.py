@@ -10,7 +10,7 @@ import logging
 from models.database import get_db
 from models.user import User, TranslationSettings
 from services.translation_service import translation_service
-from services.session_manager import get_current_user
+from services.session_manager import get_current_user, get_current_user_full, UserPrincipal
 
 logger = logging.getLogger(__name__)
 
@@ -67,7 +67,7 @@ class SynthesizeSpeechRequest(BaseModel):
 
 @router.get("/settings", response_model=TranslationSettingsResponse)
 async def get_translation_settings(
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_current_user_full),
     db: Session = Depends(get_db)
 ):
     """Get user's translation settings."""
@@ -105,7 +105,7 @@ async def get_translation_settings(
 @router.put("/settings", response_model=TranslationSettingsResponse)
 async def update_translation_settings(
     settings_request: TranslationSettingsRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_current_user_full),
     db: Session = Depends(get_db)
 ):
     """Update user's translation settings."""
@@ -154,7 +154,7 @@ async def update_translation_settings(
 @router.get("/voices/{language}", response_model=List[VoiceProfile])
 async def get_available_voices(
     language: str,
-    current_user: User = Depends(get_current_user)
+    current_user: UserPrincipal = Depends(get_current_user)
 ):
     """Get available voices for a specific language."""
     try:
@@ -180,7 +180,7 @@ async def get_available_voices(
 @router.post("/translate", response_model=TranslateTextResponse)
 async def translate_text(
     request: TranslateTextRequest,
-    current_user: User = Depends(get_current_user)
+    current_user: UserPrincipal = Depends(get_current_user)
 ):
     """Translate text from one language to another."""
     try:
@@ -208,7 +208,7 @@ async def translate_text(
 @router.post("/synthesize")
 async def synthesize_speech(
     request: SynthesizeSpeechRequest,
-    current_user: User = Depends(get_current_user)
+    current_user: UserPrincipal = Depends(get_current_user)
 ):
     """Convert text to speech audio."""
     try:
@@ -238,7 +238,7 @@ async def synthesize_speech(
 
 @router.get("/languages")
 async def get_supported_languages(
-    current_user: User = Depends(get_current_user)
+    current_user: UserPrincipal = Depends(get_current_user)
 ):
     """Get list of supported languages for translation."""
     try:
@@ -255,7 +255,7 @@ async def get_supported_languages(
 @router.post("/detect-language")
 async def detect_language(
     text: str,
-    current_user: User = Depends(get_current_user)
+    current_user: UserPrincipal = Depends(get_current_user)
 ):
     """Detect the language of input text."""
     try:
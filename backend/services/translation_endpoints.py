@@ -2,8 +2,8 @@
 WebSocket endpoints for real-time translation functionality.
 """
 import asyncio
-import json
 import logging
+import orjson
 from typing import Dict, Set
 from fastapi import WebSocket, WebSocketDisconnect, Depends
 from sqlalchemy.orm import Session
@@ -13,6 +13,10 @@ from services.session_manager import get_current_user_from_token
 
 logger = logging.getLogger(__name__)
 
+def _dumps(message: dict) -> str:
+    """Encode a message for a text WebSocket frame (the frontend JSON.parses event.data)."""
+    return orjson.dumps(message).decode('utf-8')
+
 class TranslationWebSocketManager:
     """Manage WebSocket connections for real-time translation."""
     
@@ -53,9 +57,13 @@ class TranslationWebSocketManager:
     
     async def send_to_user(self, user_id: str, message: dict):
         """Send message to specific user."""
+        await self._send_encoded(user_id, _dumps(message))
+    
+    async def _send_encoded(self, user_id: str, payload: str):
+        """Send an already-encoded message to a specific user."""
         if user_id in self.active_connections:
             try:
-                await self.active_connections[user_id].send_text(json.dumps(message))
+                await self.active_connections[user_id].send_text(payload)
             except Exception as e:
                 logger.error(f"Error sending message to user {user_id}: {e}")
     
@@ -68,8 +76,10 @@ class TranslationWebSocketManager:
         if exclude_user:
             participants.discard(exclude_user)
         
+        # Encode once for all recipients
+        payload = _dumps(message)
         for user_id in participants:
-            await self.send_to_user(user_id, message)
+            await self._send_encoded(user_id, payload)
     
     def get_room_participants(self, room_id: str) -> Set[str]:
         """Get list of participants in a room."""
@@ -93,7 +103,7 @@ async def handle_translation_websocket(
         await translation_service.start_translation_session(user_id, room_id, db)
         
         # Send initial connection confirmation
-        await websocket.send_text(json.dumps({
+        await websocket.send_text(_dumps({
             'type': 'connection_established',
             'user_id': user_id,
             'room_id': room_id,
@@ -104,20 +114,20 @@ async def handle_translation_websocket(
         while True:
             try:
                 data = await websocket.receive_text()
-                message = json.loads(data)
+                message = orjson.loads(data)
                 
                 await process_translation_message(user_id, room_id, message, db)
                 
             except WebSocketDisconnect:
                 break
-            except json.JSONDecodeError:
-                await websocket.send_text(json.dumps({
+            except orjson.JSONDecodeError:
+                await websocket.send_text(_dumps({
                     'type': 'error',
                     'message': 'Invalid JSON format'
                 }))
             except Exception as e:
                 logger.error(f"Error processing WebSocket message: {e}")
-                await websocket.send_text(json.dumps({
+                await websocket.send_text(_dumps({
                     'type': 'error',
                     'message': 'Internal server error'
                 }))
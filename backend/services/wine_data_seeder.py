@@ -4,6 +4,7 @@ Wine Data Seeder for populating the database with sample wine data.
 import uuid
 import logging
 from typing import List, Dict, Any
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
 from models.wine import Wine, Translation
@@ -30,10 +31,8 @@ class WineDataSeeder:
             
             sample_wines = self._get_sample_wine_data()
             
-            for wine_data in sample_wines:
-                wine = Wine(**wine_data)
-                db.add(wine)
-            
+            # Single executemany INSERT in one transaction
+            db.execute(insert(Wine), sample_wines)
             db.commit()
             
             logger.info(f"Successfully seeded {len(sample_wines)} sample wines")
@@ -59,10 +58,8 @@ class WineDataSeeder:
             
             translations = self._get_wine_type_translations()
             
-            for translation_data in translations:
-                translation = Translation(**translation_data)
-                db.add(translation)
-            
+            # Single executemany INSERT in one transaction
+            db.execute(insert(Translation), translations)
             db.commit()
             
             logger.info(f"Successfully seeded {len(translations)} wine type translations")
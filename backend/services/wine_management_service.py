@@ -7,7 +7,7 @@ import uuid
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_, func
+from sqlalchemy import or_, func
 
 from models.wine import Wine, Translation
 from utils.database import get_db
@@ -416,18 +416,14 @@ class WineManagementService:
         """Get translation for a key and language."""
         try:
             db = next(get_db())
-            translation = db.query(Translation).filter(
-                and_(Translation.key == key, Translation.language == language)
-            ).first()
+            translation = db.get(Translation, (key, language))
             
             if translation:
                 return translation.value
             
             # Fallback to English
             if language != 'en':
-                translation = db.query(Translation).filter(
-                    and_(Translation.key == key, Translation.language == 'en')
-                ).first()
+                translation = db.get(Translation, (key, 'en'))
                 
                 if translation:
                     return translation.value
@@ -0,0 +1,35 @@
+"""
+Small in-process Bloom filter over fixed-size hash digests.
+"""
+import math
+
+
+class BloomFilter:
+    """
+    Bloom filter keyed by uniformly distributed digests (e.g. blake2b output).
+
+    Bit positions come from the digest itself by double hashing, so no
+    extra hashing is done per lookup. No false negatives; false positives
+    at roughly ``error_rate`` once ``capacity`` keys have been added.
+    """
+
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 1e-4):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: bytes):
+        h1 = int.from_bytes(key[:8], 'little')
+        h2 = int.from_bytes(key[8:16], 'little') | 1
+        size = self.size
+        return ((h1 + i * h2) % size for i in range(self.hashes))
+
+    def add(self, key: bytes) -> None:
+        """Add a digest (at least 16 bytes) to the filter."""
+        bits = self._bits
+        for pos in self._positions(key):
+            bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: bytes) -> bool:
+        bits = self._bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
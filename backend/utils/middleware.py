@@ -0,0 +1,31 @@
+"""
+ASGI middleware shared by the API application.
+"""
+
+
+class SecurityHeadersMiddleware:
+    """Append fixed security headers to every HTTP response."""
+
+    # Pre-encoded (name, value) pairs, appended as-is to the raw header list
+    HEADERS = (
+        (b"x-content-type-options", b"nosniff"),
+        (b"x-frame-options", b"DENY"),
+        (b"x-xss-protection", b"1; mode=block"),
+    )
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", ()))
+                headers.extend(self.HEADERS)
+                message["headers"] = headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
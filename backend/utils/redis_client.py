@@ -0,0 +1,19 @@
+"""
+Shared Redis client, used when REDIS_URL is configured.
+"""
+from functools import lru_cache
+from config.settings import Config
+
+
+@lru_cache(maxsize=1)
+def get_redis():
+    """Get the shared Redis client, or None if REDIS_URL is unset or redis is not installed."""
+    if not Config.REDIS_URL:
+        return None
+    
+    try:
+        import redis
+    except ImportError:
+        return None
+    
+    return redis.Redis.from_url(Config.REDIS_URL)
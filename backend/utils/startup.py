@@ -4,9 +4,9 @@ Application startup utilities and checks.
 import sys
 import os
 from typing import Dict, Any
-from backend.config.env_validator import EnvironmentValidator
-from backend.config.oauth_config import OAuthConfig
-from backend.models.database import init_database
+from config.env_validator import EnvironmentValidator
+from config.oauth_config import OAuthConfig
+from models.database import init_database
 
 class StartupManager:
     """Manage application startup process."""
@@ -133,7 +133,7 @@ class StartupManager:
             init_database()
             
             # Test database connection
-            from backend.models.database import SessionLocal
+            from models.database import SessionLocal
             
             db = SessionLocal()
             try:
@@ -203,8 +203,9 @@ class StartupManager:
     def create_default_data(cls) -> bool:
         """Create default application data."""
         try:
-            from backend.models.database import SessionLocal
-            from backend.models.wine import VoiceProfile, Translation
+            from sqlalchemy import insert
+            from models.database import SessionLocal
+            from models.wine import VoiceProfile, Translation
             
             db = SessionLocal()
             
@@ -236,11 +237,18 @@ class StartupManager:
                 }
             ]
             
-            for voice_data in default_voices:
-                existing = db.query(VoiceProfile).filter_by(id=voice_data['id']).first()
-                if not existing:
-                    voice = VoiceProfile(**voice_data)
-                    db.add(voice)
+            # Look up existing rows once, then insert the missing ones in one batch
+            existing_voice_ids = {
+                voice_id for (voice_id,) in db.query(VoiceProfile.id).filter(
+                    VoiceProfile.id.in_([voice['id'] for voice in default_voices])
+                )
+            }
+            new_voices = [
+                voice for voice in default_voices
+                if voice['id'] not in existing_voice_ids
+            ]
+            if new_voices:
+                db.execute(insert(VoiceProfile), new_voices)
             
             # Create default translations
             default_translations = [
@@ -252,14 +260,19 @@ class StartupManager:
                 {'key': 'nav.rooms', 'language': 'en', 'value': 'Rooms'},
             ]
             
-            for trans_data in default_translations:
-                existing = db.query(Translation).filter_by(
-                    key=trans_data['key'],
-                    language=trans_data['language']
-                ).first()
-                if not existing:
-                    translation = Translation(**trans_data)
-                    db.add(translation)
+            existing_translations = {
+                (key, language) for key, language in db.query(
+                    Translation.key, Translation.language
+                ).filter(
+                    Translation.key.in_({trans['key'] for trans in default_translations})
+                )
+            }
+            new_translations = [
+                trans for trans in default_translations
+                if (trans['key'], trans['language']) not in existing_translations
+            ]
+            if new_translations:
+                db.execute(insert(Translation), new_translations)
             
             db.commit()
             db.close()